@@ -0,0 +1,98 @@
+import pygame
+import os
+import mmap
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+class AssetCache:
+    def __init__(self, cache_dir, workers=None):
+        self.cache_dir = cache_dir
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.used_blobs = set()
+
+    def load_all(self, jobs):
+        # jobs: [(paths, size)], результат: {job: surface} только для успешно загруженных
+        results = {}
+        misses = []
+        for job in dict.fromkeys(jobs):
+            surface = self._load_cached(job)
+            if surface is not None:
+                results[job] = surface
+            else:
+                misses.append(job)
+        if misses:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for job, pixels in zip(misses, pool.map(self._decode, misses)):
+                    if pixels is not None:
+                        results[job] = self._to_surface(pixels, job[1])
+        return results
+
+    def prune(self):
+        # Убираем блобы от старых версий файлов и размеров
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".rgba") and name not in self.used_blobs:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _load_cached(self, job):
+        paths, size = job
+        for path in paths:
+            blob_path = self._blob_path(path, size)
+            if blob_path is None:
+                continue
+            try:
+                with open(blob_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size != size[0] * size[1] * 4:
+                        return None
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pixels:
+                        surface = self._to_surface(pixels, size)
+                self.used_blobs.add(os.path.basename(blob_path))
+                return surface
+            except (OSError, ValueError, pygame.error):
+                return None
+        return None
+
+    def _decode(self, job):
+        paths, size = job
+        for path in paths:
+            blob_path = self._blob_path(path, size)
+            if blob_path is None:
+                continue
+            try:
+                image = pygame.image.load(path)
+                pixels = pygame.image.tobytes(pygame.transform.scale(image, size), "RGBA")
+            except pygame.error:
+                continue
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = blob_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(pixels)
+                os.replace(tmp_path, blob_path)
+                self.used_blobs.add(os.path.basename(blob_path))
+            except OSError:
+                pass
+            return pixels
+        return None
+
+    def _to_surface(self, pixels, size):
+        surface = pygame.image.frombuffer(pixels, size, "RGBA")
+        # convert_alpha копирует пиксели, после чего буфер (mmap) можно закрыть
+        try:
+            return surface.convert_alpha()
+        except pygame.error:
+            return surface.copy()
+
+    def _blob_path(self, path, size):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".rgba")
@@ -0,0 +1,62 @@
+import pygame
+import os
+import hashlib
+from collections import OrderedDict
+from PIL import Image, ImageFilter
+
+class BackgroundCache:
+    def __init__(self, max_entries=4, cache_dir=None, blur_radius=5):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.blur_radius = blur_radius
+        self.surfaces = OrderedDict()
+
+    def get(self, image_path, size):
+        key = (image_path, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self._build(image_path, size)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def _build(self, image_path, size):
+        disk_path = self._disk_path(image_path, size)
+        if disk_path and os.path.exists(disk_path):
+            try:
+                return pygame.image.load(disk_path).convert()
+            except pygame.error:
+                pass
+
+        pil_image = Image.open(image_path)
+        blurred_image = pil_image.filter(ImageFilter.GaussianBlur(radius=self.blur_radius))
+        blurred_image = blurred_image.resize(size, Image.LANCZOS)
+        if blurred_image.mode not in ("RGB", "RGBA"):
+            blurred_image = blurred_image.convert("RGBA")
+        surface = pygame.image.fromstring(blurred_image.tobytes(), blurred_image.size, blurred_image.mode).convert()
+
+        if disk_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = disk_path + ".tmp"
+                blurred_image.save(tmp_path, format="PNG")
+                os.replace(tmp_path, disk_path)
+            except OSError:
+                pass
+        return surface
+
+    def _disk_path(self, image_path, size):
+        if not self.cache_dir:
+            return None
+        try:
+            mtime = os.stat(image_path).st_mtime_ns
+        except OSError:
+            return None
+        key = f"{os.path.abspath(image_path)}|{size[0]}x{size[1]}|{self.blur_radius}|{mtime}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
@@ -0,0 +1,162 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import itertools
+import traceback
+import multiprocessing
+import headless
+import settings
+
+CSV_FIELDS = ["id", "level", "plan", "upgrades", "waves", "result", "waves_cleared", "waves_total",
+              "lives_left", "stars", "money", "enemies_killed", "ticks", "sim_seconds", "wall_seconds",
+              "ticks_per_second", "gold_curve", "failed_actions", "error"]
+
+def load_named(entries, base_dir):
+    # Элемент сетки: либо словарь имя -> значение, либо список путей к JSON-файлам
+    if entries is None:
+        return {"default": None}
+    if isinstance(entries, list):
+        named = {}
+        for path in entries:
+            full_path = os.path.join(base_dir, path)
+            with open(full_path, "r", encoding="utf-8") as f:
+                named[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+        return named
+    return entries
+
+def expand_waves(level_num, override):
+    if override is None:
+        return None
+    if isinstance(override, list):
+        return override
+    waves = [dict(wave) for wave in settings.LEVELS_CONFIG[level_num]["waves"]]
+    # Новые волны дописываются только подряд за последней, иначе сетка описывала бы другой уровень
+    for index, wave in sorted((int(wave_index), wave) for wave_index, wave in override.items()):
+        if not 0 <= index <= len(waves):
+            raise ValueError(f"Уровень {level_num}: волна {index} вне диапазона 0..{len(waves)}")
+        if index < len(waves):
+            waves[index] = wave
+        else:
+            waves.append(wave)
+    return waves
+
+def build_scenarios(grid, base_dir="."):
+    levels = grid.get("levels", list(settings.LEVELS_CONFIG.keys()))
+    plans = load_named(grid.get("plans"), base_dir)
+    upgrade_schedules = load_named(grid.get("upgrade_schedules"), base_dir)
+    wave_overrides = load_named(grid.get("wave_overrides"), base_dir)
+    max_ticks = grid.get("max_ticks", 1_000_000)
+
+    scenarios = []
+    for level_num, (plan_name, plan), (schedule_name, schedule), (waves_name, override) in itertools.product(
+            levels, plans.items(), upgrade_schedules.items(), wave_overrides.items()):
+        full_plan = dict(plan or {})
+        if schedule is not None:
+            full_plan["upgrades"] = list(full_plan.get("upgrades", [])) + list(schedule)
+        scenarios.append({
+            "id": f"{level_num}|{plan_name}|{schedule_name}|{waves_name}",
+            "level": level_num, "plan_name": plan_name, "upgrades_name": schedule_name, "waves_name": waves_name,
+            "plan": full_plan, "waves": expand_waves(level_num, override), "max_ticks": max_ticks,
+        })
+    return scenarios
+
+def init_worker(use_enemy_engine, use_projectile_engine):
+    headless.setup_headless(use_enemy_engine=use_enemy_engine, use_projectile_engine=use_projectile_engine)
+
+def run_scenario(scenario):
+    row = {"id": scenario["id"], "level": scenario["level"], "plan": scenario["plan_name"],
+           "upgrades": scenario["upgrades_name"], "waves": scenario["waves_name"]}
+    try:
+        summary = headless.run_simulation(scenario["level"], scenario["plan"], scenario["max_ticks"], scenario["waves"])
+        summary.pop("level", None)
+        row.update(summary)
+    except Exception:
+        row["error"] = traceback.format_exc()
+    return row
+
+def load_finished(output_path):
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, "r", encoding="utf-8", newline="") as f:
+        if output_path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if not row.get("error"):
+                finished.add(row["id"])
+    return finished
+
+class ResultWriter:
+    def __init__(self, output_path):
+        self.is_csv = output_path.endswith(".csv")
+        write_header = self.is_csv and (not os.path.exists(output_path) or os.path.getsize(output_path) == 0)
+        self.file = open(output_path, "a", encoding="utf-8", newline="")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            flat = dict(row)
+            for key in ("gold_curve", "failed_actions"):
+                if key in flat:
+                    flat[key] = json.dumps(flat[key], ensure_ascii=False)
+            self.writer.writerow(flat)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        # Каждая строка сразу на диске: прерванный прогон можно продолжить
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+def run_batch(scenarios, output_path, processes=None, use_enemy_engine=None, use_projectile_engine=None):
+    finished = load_finished(output_path)
+    pending = [scenario for scenario in scenarios if scenario["id"] not in finished]
+    print(f"Сценариев: {len(scenarios)}, уже готово: {len(scenarios) - len(pending)}, осталось: {len(pending)}", file=sys.stderr)
+    if not pending:
+        return 0
+
+    writer = ResultWriter(output_path)
+    pool = multiprocessing.Pool(processes or os.cpu_count(), initializer=init_worker, initargs=(use_enemy_engine, use_projectile_engine))
+    done = 0
+    try:
+        for row in pool.imap_unordered(run_scenario, pending, chunksize=1):
+            writer.write(row)
+            done += 1
+            status = "ошибка" if row.get("error") else row.get("result")
+            print(f"[{done}/{len(pending)}] {row['id']}: {status}", file=sys.stderr)
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        print(f"Прервано. Готовые результаты в {output_path}, повторный запуск продолжит с места остановки.", file=sys.stderr)
+    finally:
+        pool.join()
+        writer.close()
+    return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Параллельный прогон сетки сценариев баланса")
+    parser.add_argument("grid", help="JSON с сеткой: levels, plans, upgrade_schedules, wave_overrides, max_ticks")
+    parser.add_argument("--output", default="batch_results.jsonl", help="файл результатов (.jsonl или .csv)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--enemy-engine", action="store_true", help="векторный движок врагов")
+    parser.add_argument("--projectile-engine", action="store_true", help="векторный движок снарядов (включает движок врагов)")
+    args = parser.parse_args(argv)
+
+    with open(args.grid, "r", encoding="utf-8") as f:
+        grid = json.load(f)
+    try:
+        scenarios = build_scenarios(grid, os.path.dirname(os.path.abspath(args.grid)))
+    except ValueError as e:
+        parser.error(str(e))
+    run_batch(scenarios, args.output, args.processes, args.enemy_engine or None, args.projectile_engine or None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import json
+import time
+import random
+import gc
+import tracemalloc
+import argparse
+import platform
+import subprocess
+import pygame
+import settings
+from settings import TOWER_DATA, GAME_AREA_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT
+from level import GameLevel
+from towers import Tower
+from headless import HeadlessController
+
+TOWER_TYPES = list(TOWER_DATA.keys())
+ENEMY_TYPES = ["goblin", "orc", "knight", "rogue", "slime"]
+
+class SyntheticScene:
+    def __init__(self, level_num, enemies, towers, projectiles, seed=0, use_enemy_engine=None, use_projectile_engine=None):
+        self.random = random.Random(seed)
+        self.enemy_count = enemies
+        self.projectile_count = projectiles
+        self.level = GameLevel(level_num, HeadlessController(), use_enemy_engine=use_enemy_engine, use_projectile_engine=use_projectile_engine)
+        self.level.health = self.level.start_health = 10 ** 9
+        self.level.state = "wave_in_progress"
+        self._place_towers(towers)
+        self.replenish()
+
+    def _place_towers(self, count):
+        level = self.level
+        candidates = [(x, y) for x in range(40, GAME_AREA_WIDTH - 40, 60) for y in range(40, SCREEN_HEIGHT - 40, 60)]
+        self.random.shuffle(candidates)
+        legal = [pos for pos in candidates if level.check_placement_legality(pos)]
+        positions = (legal + [pos for pos in candidates if pos not in legal])[:count]
+        while len(positions) < count:
+            positions.append((self.random.randint(40, GAME_AREA_WIDTH - 40), self.random.randint(40, SCREEN_HEIGHT - 40)))
+        for pos in positions:
+            tower = Tower(self.random.choice(TOWER_TYPES), pos, level.sim_time)
+            tower.range = int(tower.range * 1.5)
+            level.add_tower(tower)
+
+    def replenish(self):
+        level = self.level
+        level.enemies.compact(); level.projectiles.compact()
+        total_length = level.compiled_path.total_length
+        while len(level.enemies) < self.enemy_count:
+            enemy = level.create_enemy(self.random.choice(ENEMY_TYPES))
+            progress = self.random.uniform(0, total_length * 0.95)
+            enemy.place_on_path(level.compiled_path.segment_at(progress), progress)
+            # Бессмертные враги держат размер сцены постоянным
+            enemy.max_health = enemy.health = 10 ** 9
+            level.enemies.add(enemy)
+        if not level.enemies or not level.towers:
+            return
+        enemies = list(level.enemies); towers = list(level.towers)
+        while len(level.projectiles) < self.projectile_count:
+            tower = self.random.choice(towers)
+            level.projectiles.spawn(tower.pos, self.random.choice(enemies), 0, TOWER_DATA[tower.tower_type]["projectile"], None)
+
+    def object_count(self):
+        return len(self.level.enemies) + len(self.level.towers) + len(self.level.projectiles)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+def summarize(samples, objects, allocations=None, gc_collections=0):
+    mean = sum(samples) / len(samples)
+    result = {
+        "frames": len(samples),
+        "mean_ms": round(mean * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+        "max_ms": round(max(samples) * 1000, 4),
+        "objects_per_frame": round(objects, 1),
+        "objects_per_second": round(objects / mean, 1) if mean > 0 else None,
+        "gc_collections": gc_collections,
+    }
+    if allocations:
+        result["alloc_peak_kb_mean"] = round(sum(allocations) / len(allocations) / 1024, 2)
+        result["alloc_peak_kb_max"] = round(max(allocations) / 1024, 2)
+    return result
+
+def bench_update(scene, surface):
+    scene.level.update()
+    return scene.object_count()
+
+def bench_draw(scene, surface):
+    scene.level.draw(surface)
+    return scene.object_count()
+
+def bench_find_target(scene, surface):
+    grid = scene.level.enemy_grid
+    for tower in scene.level.towers:
+        tower.find_target(grid)
+    return len(scene.level.towers)
+
+def bench_projectile_update(scene, surface):
+    count = len(scene.level.projectiles)
+    scene.level.projectiles.update()
+    return count
+
+BENCHMARKS = {
+    "level_update": bench_update,
+    "level_draw": bench_draw,
+    "find_target": bench_find_target,
+    "projectile_update": bench_projectile_update,
+}
+
+def run_benchmark(name, args, surface):
+    scene = SyntheticScene(args.level, args.enemies, args.towers, args.projectiles, args.seed, args.enemy_engine or None, args.projectile_engine or None)
+    bench = BENCHMARKS[name]
+    samples = []; allocations = []; objects = 0; gc_collections = 0
+    if args.tracemalloc:
+        tracemalloc.start()
+    for frame in range(args.warmup + args.frames):
+        # Подготовка кадра не входит в замер
+        scene.level.rebuild_enemy_grid()
+        if args.tracemalloc:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        collections = sum(stat["collections"] for stat in gc.get_stats())
+        started = time.perf_counter()
+        processed = bench(scene, surface)
+        elapsed = time.perf_counter() - started
+        if frame >= args.warmup:
+            samples.append(elapsed); objects += processed
+            gc_collections += sum(stat["collections"] for stat in gc.get_stats()) - collections
+            if args.tracemalloc:
+                allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+        scene.replenish()
+    if args.tracemalloc:
+        tracemalloc.stop()
+    result = summarize(samples, objects / len(samples), allocations, gc_collections)
+    result["pools"] = pool_stats(scene)
+    return result
+
+def pool_stats(scene):
+    # Сколько объектов пулы создали с нуля и сколько выдали повторно за весь прогон
+    stats = {}
+    for name, group in (("enemies", scene.level.enemies), ("projectiles", scene.level.projectiles)):
+        pool = getattr(group, "pool", None)
+        if pool is not None:
+            stats[name] = {"created": pool.created, "reused": pool.reused}
+    return stats
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(base_path, new_path):
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'benchmark':<20}{'metric':<10}{base['meta'].get('revision') or 'base':>12}{new['meta'].get('revision') or 'new':>12}{'change':>10}")
+    for name, new_result in new["results"].items():
+        base_result = base["results"].get(name)
+        if not base_result:
+            continue
+        for metric in ("mean_ms", "p95_ms", "p99_ms"):
+            old_value, new_value = base_result[metric], new_result[metric]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"{name:<20}{metric:<10}{old_value:>12.3f}{new_value:>12.3f}{change:>+9.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочные замеры update/draw на синтетической сцене")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--enemies", type=int, default=300)
+    parser.add_argument("--towers", type=int, default=40)
+    parser.add_argument("--projectiles", type=int, default=150)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS.keys()))
+    parser.add_argument("--enemy-engine", action="store_true", help="векторный движок врагов")
+    parser.add_argument("--projectile-engine", action="store_true", help="векторный движок снарядов (включает движок врагов)")
+    parser.add_argument("--headless-images", action="store_true", help="пустые спрайты вместо декодирования PNG")
+    parser.add_argument("--tracemalloc", action="store_true", help="пиковые аллокации за кадр (замедляет замеры)")
+    parser.add_argument("--output", help="куда записать JSON с результатами")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="сравнить два JSON с результатами")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    settings.init_pygame(warm_up=False)
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    settings.load_images(headless=args.headless_images)
+    settings.update_unit_data()
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = run_benchmark(name, args, surface)
+        result = results[name]
+        print(f"{name:<20} mean {result['mean_ms']:>8.3f} ms  p95 {result['p95_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms  {result['objects_per_second']:>12.0f} obj/s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "params": {key: getattr(args, key) for key in ("level", "enemies", "towers", "projectiles", "frames", "warmup", "seed", "enemy_engine", "projectile_engine", "headless_images", "tracemalloc")},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
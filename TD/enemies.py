@@ -1,13 +1,26 @@
 import pygame
 from settings import ENEMY_DATA, HIT_SOUND, GREEN, RED
+from sound import sounds
+
+class Enemy:
+    __slots__ = ("enemy_type", "path", "path_index", "game_level", "compiled_path", "max_health", "health",
+                 "speed", "original_speed", "reward", "image", "steals_gold", "pos", "prev_pos", "rect",
+                 "path_progress", "slow_timer", "active", "group", "generation")
 
-class Enemy(pygame.sprite.Sprite):
     def __init__(self, enemy_type, path, game_level):
-        super().__init__()
+        self.active = False
+        self.group = None
+        self.generation = 0
+        self.reset(enemy_type, path, game_level)
+
+    def reset(self, enemy_type, path, game_level):
+        # Экземпляры переиспользуются пулом; поколение отличает новую жизнь от старой
+        self.generation += 1
         self.enemy_type = enemy_type
         self.path = path
         self.path_index = 0
         self.game_level = game_level  
+        self.compiled_path = game_level.compiled_path
         
         data = ENEMY_DATA[enemy_type]
         self.max_health = data["health"]
@@ -19,11 +32,18 @@ class Enemy(pygame.sprite.Sprite):
         self.steals_gold = data.get("steals_gold", 0)
 
         self.pos = pygame.math.Vector2(self.path[0])
+        self.prev_pos = pygame.math.Vector2(self.pos)
         self.rect = self.image.get_rect(center=self.pos)
         self.path_progress = 0
         self.slow_timer = 0
 
-    
+    def alive(self):
+        return self.active
+
+    def kill(self):
+        if self.group is not None:
+            self.group.discard(self)
+
     def update(self):
         self.move()
         self.check_slow_effect()
@@ -33,21 +53,22 @@ class Enemy(pygame.sprite.Sprite):
             self.reach_end()
             return
         
-        target_pos = pygame.math.Vector2(self.path[self.path_index + 1])
-        try:
-            direction = (target_pos - self.pos).normalize()
-        except ValueError:
-            direction = pygame.math.Vector2(0, 0)
-        
-        distance_to_target = self.pos.distance_to(target_pos)
-        
+        # Позиция - функция пройденного пути, без векторной математики в каждом кадре
+        self.prev_pos.update(self.pos)
+        distance_to_target = self.compiled_path.cumulative[self.path_index + 1] - self.path_progress
         move_dist = min(self.speed, distance_to_target)
-        self.pos += direction * move_dist
-        self.rect.center = self.pos
         self.path_progress += move_dist
-
         if distance_to_target < self.speed:
             self.path_index += 1
+        self.pos.update(self.compiled_path.position_at(self.path_progress, self.path_index))
+        self.rect.center = self.pos
+
+    def place_on_path(self, path_index, path_progress):
+        self.path_index = path_index
+        self.path_progress = path_progress
+        self.pos = pygame.math.Vector2(self.compiled_path.position_at(path_progress, path_index))
+        self.prev_pos = pygame.math.Vector2(self.pos)
+        self.rect.center = self.pos
 
     def reach_end(self):
         self.game_level.health -= 1
@@ -57,8 +78,7 @@ class Enemy(pygame.sprite.Sprite):
 
     def take_damage(self, damage):
         self.health -= damage
-        if HIT_SOUND:
-            HIT_SOUND.play()
+        sounds.play(HIT_SOUND)
         if self.health <= 0:
             self.die()
 
@@ -70,29 +90,34 @@ class Enemy(pygame.sprite.Sprite):
         if spawn_info:
             spawn_type, count = spawn_info
             for _ in range(count):
-                new_enemy = Enemy(spawn_type, self.path, self.game_level)
-                new_enemy.pos = pygame.math.Vector2(self.pos)
-                new_enemy.path_index = self.path_index
-                new_enemy.path_progress = self.path_progress
+                new_enemy = self.game_level.create_enemy(spawn_type)
+                new_enemy.place_on_path(self.path_index, self.path_progress)
                 self.game_level.enemies.add(new_enemy)
         self.kill()
 
     def apply_slow(self, factor, duration):
         self.speed = self.original_speed * factor
-        self.slow_timer = pygame.time.get_ticks() + duration
+        self.slow_timer = self.game_level.sim_time + duration
 
     def check_slow_effect(self):
-        if self.slow_timer > 0 and pygame.time.get_ticks() > self.slow_timer:
+        if self.slow_timer > 0 and self.game_level.sim_time > self.slow_timer:
             self.speed = self.original_speed
             self.slow_timer = 0
 
-    def draw_health_bar(self, surface):
+    def draw(self, surface, alpha=1.0):
+        rect = self.image.get_rect(center=self.prev_pos.lerp(self.pos, alpha))
+        surface.blit(self.image, rect)
+        self.draw_health_bar(surface, rect)
+        return rect.union((rect.centerx - 15, rect.top - 10, 30, 4))
+
+    def draw_health_bar(self, surface, rect=None):
+        rect = rect or self.rect
         if self.health < self.max_health:
             bar_width = 30
             bar_height = 4
             fill_width = int((self.health / self.max_health) * bar_width)
-            bar_x = self.rect.centerx - bar_width // 2
-            bar_y = self.rect.top - 10
+            bar_x = rect.centerx - bar_width // 2
+            bar_y = rect.top - 10
             
             pygame.draw.rect(surface, RED, (bar_x, bar_y, bar_width, bar_height))
             pygame.draw.rect(surface, GREEN, (bar_x, bar_y, fill_width, bar_height))
\ No newline at end of file
@@ -0,0 +1,202 @@
+import pygame
+import numpy as np
+from enemies import Enemy
+
+ENGINE_FIELDS = (
+    ("x", np.float64), ("y", np.float64), ("prev_x", np.float64), ("prev_y", np.float64),
+    ("speed", np.float64), ("original_speed", np.float64),
+    ("path_index", np.int32), ("progress", np.float64), ("slow_timer", np.float64),
+    ("width", np.int64), ("height", np.int64),
+)
+
+class EnemyEngine:
+    def __init__(self, compiled_path, capacity=256):
+        self.compiled_path = compiled_path
+        self.last_index = compiled_path.last_index
+        self.count = 0
+        self.enemies = []
+        # Подписчики узнают о переносе слотов при удалении (slot, last)
+        self.slot_listeners = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        for name, dtype in ENGINE_FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            if self.count:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, enemy):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        slot = self.count
+        for name, _ in ENGINE_FIELDS:
+            getattr(self, name)[slot] = 0
+        self.enemies.append(enemy)
+        self.count += 1
+        return slot
+
+    def remove(self, enemy):
+        slot = enemy.slot
+        last = self.count - 1
+        if slot != last:
+            for name, _ in ENGINE_FIELDS:
+                array = getattr(self, name)
+                array[slot] = array[last]
+            moved = self.enemies[last]
+            moved.slot = slot
+            self.enemies[slot] = moved
+        self.enemies.pop()
+        self.count -= 1
+        enemy.slot = None
+        for listener in self.slot_listeners:
+            listener(slot, last)
+
+    def step(self, now):
+        n = self.count
+        if not n:
+            return
+        # Враги, уже стоящие на последней точке пути, доходят до конца в этом кадре
+        finished = np.flatnonzero(self.path_index[:n] >= self.last_index)
+        if finished.size:
+            for enemy in [self.enemies[slot] for slot in finished]:
+                enemy.reach_end()
+            n = self.count
+            if not n:
+                return
+
+        self.prev_x[:n] = self.x[:n]; self.prev_y[:n] = self.y[:n]
+        speed = self.speed[:n]; index = self.path_index[:n]; progress = self.progress[:n]
+        distance = self.compiled_path.cumulative_array[index + 1] - progress
+        progress += np.minimum(speed, distance)
+        index += distance < speed
+        self.x[:n], self.y[:n] = self.compiled_path.positions_at(progress, index)
+
+        slow_timer = self.slow_timer[:n]
+        expired = (slow_timer > 0) & (now > slow_timer)
+        if expired.any():
+            speed[expired] = self.original_speed[:n][expired]
+            slow_timer[expired] = 0
+
+    def draw(self, surface, alpha=1.0):
+        # Как Enemy.draw, но центры интерполируются сразу для всех
+        n = self.count
+        if not n:
+            return []
+        center_x = self.prev_x[:n] * (1 - alpha) + self.x[:n] * alpha
+        center_y = self.prev_y[:n] * (1 - alpha) + self.y[:n] * alpha
+        blit = surface.blit
+        rects = []
+        for enemy, x, y in zip(self.enemies, center_x.tolist(), center_y.tolist()):
+            image = enemy.image
+            rect = image.get_rect(center=(x, y))
+            blit(image, rect)
+            if enemy.health < enemy.max_health:
+                enemy.draw_health_bar(surface, rect)
+            rects.append(rect.union((rect.centerx - 15, rect.top - 10, 30, 4)))
+        return rects
+
+class EngineEnemy(Enemy):
+    __slots__ = ("engine", "slot")
+
+    def reset(self, enemy_type, path, game_level):
+        self.engine = game_level.enemy_engine
+        self.slot = self.engine.add(self)
+        super().reset(enemy_type, path, game_level)
+        self.engine.width[self.slot], self.engine.height[self.slot] = self.image.get_size()
+
+    def live_slot(self):
+        # После kill слота нет, а engine.x[None] молча вернул бы весь массив
+        if self.slot is None:
+            raise ReferenceError(f"Враг {self.enemy_type} уже удалён из движка")
+        return self.slot
+
+    @property
+    def pos(self):
+        slot = self.live_slot()
+        return pygame.math.Vector2(self.engine.x[slot], self.engine.y[slot])
+
+    @pos.setter
+    def pos(self, value):
+        slot = self.live_slot()
+        self.engine.x[slot] = value[0]
+        self.engine.y[slot] = value[1]
+
+    @property
+    def prev_pos(self):
+        slot = self.live_slot()
+        return pygame.math.Vector2(self.engine.prev_x[slot], self.engine.prev_y[slot])
+
+    @prev_pos.setter
+    def prev_pos(self, value):
+        slot = self.live_slot()
+        self.engine.prev_x[slot] = value[0]
+        self.engine.prev_y[slot] = value[1]
+
+    @property
+    def rect(self):
+        slot = self.live_slot()
+        return self.image.get_rect(center=(self.engine.x[slot], self.engine.y[slot]))
+
+    @rect.setter
+    def rect(self, value):
+        pass
+
+    @property
+    def speed(self):
+        slot = self.live_slot()
+        return float(self.engine.speed[slot])
+
+    @speed.setter
+    def speed(self, value):
+        slot = self.live_slot()
+        self.engine.speed[slot] = value
+
+    @property
+    def original_speed(self):
+        slot = self.live_slot()
+        return float(self.engine.original_speed[slot])
+
+    @original_speed.setter
+    def original_speed(self, value):
+        slot = self.live_slot()
+        self.engine.original_speed[slot] = value
+
+    @property
+    def path_index(self):
+        slot = self.live_slot()
+        return int(self.engine.path_index[slot])
+
+    @path_index.setter
+    def path_index(self, value):
+        slot = self.live_slot()
+        self.engine.path_index[slot] = value
+
+    @property
+    def path_progress(self):
+        slot = self.live_slot()
+        return float(self.engine.progress[slot])
+
+    @path_progress.setter
+    def path_progress(self, value):
+        slot = self.live_slot()
+        self.engine.progress[slot] = value
+
+    @property
+    def slow_timer(self):
+        slot = self.live_slot()
+        return float(self.engine.slow_timer[slot])
+
+    @slow_timer.setter
+    def slow_timer(self, value):
+        slot = self.live_slot()
+        self.engine.slow_timer[slot] = value
+
+    def update(self):
+        pass
+
+    def kill(self):
+        if self.slot is not None:
+            self.engine.remove(self)
+        super().kill()
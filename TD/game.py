@@ -1,9 +1,16 @@
 import pygame
 import settings
 from settings import *
-from ui import Button, Slider
+from ui import Button, LevelButton, Label, Slider, WidgetLayer, render_text
+from backgrounds import BackgroundCache
+from renderer import DirtyRectRenderer
+from profiler import profiler
+from sound import sounds
+from replay import ReplayRecorder, ReplayPlayer, replay_path, prune_replays
+import savegame
 import os
-from PIL import Image, ImageFilter
+import time
+import struct
 
 class Game:
     def __init__(self, screen, clock):
@@ -15,6 +22,18 @@ class Game:
         self.previous_state = None
         self.pending_state = None
         self.handling_win = False
+        self.frame_ms = 0
+        self.game_speed = 1
+        self.background_cache = BackgroundCache(cache_dir=os.path.join(CACHE_DIR, "backgrounds"))
+        self.renderer = DirtyRectRenderer(screen, enabled=DIRTY_RECT_RENDERING)
+        self.hud_panel_key = None
+        self.tower_panel_signature = None
+        self.fallback_background = None
+        self.hud_overlay_rects = []
+        self.profiler_rects = []
+        self.save_writer = savegame.SaveWriter()
+        self.has_save = os.path.exists(SAVE_PATH)
+        self.saved_level = None
 
         self.game_settings = {"music_volume": 0.5, "sfx_volume": 0.5}
         self.update_volumes()
@@ -54,11 +73,26 @@ class Game:
     def update_volumes(self):
         sounds = [SHOOT_SOUND, HIT_SOUND, PLACE_TOWER_SOUND, UPGRADE_SOUND, SELL_SOUND]
         for sound in sounds:
-            if sound: 
-                sound.set_volume(self.game_settings["sfx_volume"])
-        pygame.mixer.music.set_volume(self.game_settings["music_volume"])
+            # Канал играет голос на SFX_VOICE_VOLUME, одиночный эффект звучит с громкостью ползунка
+            sound.set_volume(min(1.0, self.game_settings["sfx_volume"] / SFX_VOICE_VOLUME))
+        if pygame.mixer.get_init():
+            pygame.mixer.music.set_volume(self.game_settings["music_volume"])
+
+    def setup_main_menu_buttons(self):
+        # Вызывается при появлении или удалении сохранения
+        btn_w, btn_h = 300, 70
+        self.main_menu_buttons = [
+            Button(SCREEN_WIDTH // 2, 300, btn_w, btn_h, "Начать игру", self.go_to_level_select),
+            Button(SCREEN_WIDTH // 2, 400, btn_w, btn_h, "Настройки", self.go_to_settings),
+            Button(SCREEN_WIDTH // 2, 500, btn_w, btn_h, "Выход", self.quit_game)
+        ]
+        if self.has_save:
+            self.main_menu_buttons.insert(0, Button(SCREEN_WIDTH // 2, 200, btn_w, btn_h, "Продолжить", self.continue_saved_game))
+        self.menu_layers["main_menu"].set_widgets([Label("Защита королевства", FONT_TITLE, WHITE, (SCREEN_WIDTH // 2, 100))] + self.main_menu_buttons)
+        self.renderer.invalidate()
 
     def setup_level_buttons(self):
+        # Вызывается только при изменении прогресса, а не каждый кадр
         btn_w, btn_h = 200, 70
         max_unlocked = self.get_unlocked_level()
         self.level_select_buttons = [Button(SCREEN_WIDTH // 2, 650, 300, 70, "Назад", self.go_to_main_menu)]
@@ -68,23 +102,34 @@ class Game:
             x, y = (SCREEN_WIDTH // 4) * (col + 1), 250 + row * 150
             is_locked = level_num > max_unlocked
             callback_func = (lambda l=level_num: self.start_level(l)) if not is_locked else (lambda: None)
-            btn = Button(x, y, btn_w, btn_h, f"Уровень {level_num}", callback_func)
-            btn.stars = self.progress_data.get(level_num, 0)
+            btn = LevelButton(x, y, btn_w, btn_h, f"Уровень {level_num}", callback_func, stars=self.progress_data.get(level_num, 0))
             if is_locked: 
                 btn.color = btn.hover_color = BUTTON_LOCKED_COLOR
             self.level_select_buttons.append(btn)
+        self.menu_layers["level_select"].set_widgets(self.level_select_buttons)
+        self.renderer.invalidate()
             
     def setup_ui(self):
         btn_w, btn_h = 300, 70
-        self.main_menu_buttons = [
-            Button(SCREEN_WIDTH // 2, 300, btn_w, btn_h, "Начать игру", self.go_to_level_select),
-            Button(SCREEN_WIDTH // 2, 400, btn_w, btn_h, "Настройки", self.go_to_settings),
-            Button(SCREEN_WIDTH // 2, 500, btn_w, btn_h, "Выход", self.quit_game)
-        ]
-        self.setup_level_buttons()
         self.settings_buttons = [Button(SCREEN_WIDTH // 2, 550, btn_w, btn_h, "Назад", self.exit_settings)]
         self.music_slider = Slider(SCREEN_WIDTH // 2 - 200, 300, 400, 20, 0, 1, self.game_settings["music_volume"])
         self.sfx_slider = Slider(SCREEN_WIDTH // 2 - 200, 400, 400, 20, 0, 1, self.game_settings["sfx_volume"])
+        self.menu_backgrounds = {
+            "main_menu": "assets/images/backgrounds/main_menu_background.png",
+            "level_select": "assets/images/backgrounds/level_select_background.png",
+            "settings": "assets/images/backgrounds/settings_background.png",
+        }
+        self.menu_layers = {
+            "main_menu": WidgetLayer(),
+            "level_select": WidgetLayer(),
+            "settings": WidgetLayer([
+                Label("Громкость музыки", FONT_SMALL, WHITE, (self.music_slider.rect.centerx, self.music_slider.rect.y - 40), anchor="midtop"),
+                Label("Громкость эффектов", FONT_SMALL, WHITE, (self.sfx_slider.rect.centerx, self.sfx_slider.rect.y - 40), anchor="midtop"),
+                self.music_slider, self.sfx_slider,
+            ] + self.settings_buttons),
+        }
+        self.setup_main_menu_buttons()
+        self.setup_level_buttons()
         self.pause_menu_buttons = [
             Button(SCREEN_WIDTH // 2, 250, btn_w, btn_h, "Продолжить", self.resume_game),
             Button(SCREEN_WIDTH // 2, 350, btn_w, btn_h, "Настройки", self.go_to_settings_from_pause),
@@ -98,6 +143,7 @@ class Game:
             Button(panel_x, 410, 200, 60, f"Маг ({TOWER_DATA['mage']['cost']})", lambda: self.select_tower("mage"), font=FONT_SMALL)
         ]
         self.start_wave_button = Button(panel_x, SCREEN_HEIGHT - 80, 200, 60, "Начать Волну", self.trigger_wave_start, font=FONT_SMALL)
+        self.speed_button = Button(panel_x, SCREEN_HEIGHT - 150, 200, 50, self.get_speed_label(), self.cycle_game_speed, font=FONT_SMALL)
         
         self.tower_control_buttons = {
             "sell": Button(panel_x, 500, 200, 50, "Продать", self.sell_selected_tower, font=FONT_SMALL),
@@ -105,23 +151,33 @@ class Game:
             "upgrade_fire_rate": Button(panel_x, 320, 200, 60, "Скорость", lambda: self.upgrade_selected_tower('fire_rate'), font=FONT_SMALL),
             "upgrade_range": Button(panel_x, 390, 200, 60, "Дальность", lambda: self.upgrade_selected_tower('range'), font=FONT_SMALL),
         }
+        self.wave_panel_rect = pygame.Rect(10, 10, 240, 50)
         self.settings_icon_rect = settings.UI_IMAGES.get("settings_gear", pygame.Surface((10, 10), pygame.SRCALPHA)).get_rect(topleft=(20, SCREEN_HEIGHT - 60))
 
     def run(self):
         self.play_music()
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                else:
-                    self.handle_events(event)
-            self.process_pending_state()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+            profiler.begin_frame()
+            with profiler.section("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                    else:
+                        self.handle_events(event)
+            with profiler.section("update"):
+                self.process_pending_state()
+                self.update()
+            with profiler.section("sound"):
+                sounds.flush()
+            with profiler.section("draw"):
+                self.draw()
+            profiler.end_frame()
+            self.frame_ms = self.clock.tick(FPS)
+        self.leave_level()
+        self.save_writer.close()
 
     def play_music(self):
-        if settings.BACKGROUND_MUSIC:
+        if settings.BACKGROUND_MUSIC and settings.load_music():
             try:
                 pygame.mixer.music.play(-1)
             except pygame.error:
@@ -129,6 +185,12 @@ class Game:
                 settings.BACKGROUND_MUSIC = False
 
     def handle_events(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_profiler()
+            return
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+            self.dump_profile()
+            return
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3: 
             self.selected_tower_type = self.selected_tower = None
         
@@ -164,6 +226,12 @@ class Game:
         elif self.state == "in_game":
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: 
                 self.pending_state = "pause"
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h and self.game_instance:
+                self.game_instance.toggle_heatmap()
+            self.speed_button.handle_event(event)
+            # Пока идёт повтор, действия игрока рассинхронизировали бы запись
+            if self.game_instance and self.game_instance.replay and not self.game_instance.replay.finished:
+                return
             if self.game_instance:
                 if self.selected_tower:
                     for btn in self.tower_control_buttons.values(): 
@@ -199,6 +267,7 @@ class Game:
                 self.resume_game()
             elif self.pending_state == "pause":
                 self.state = "pause"
+                sounds.clear()
             self.pending_state = None
             self.play_music()
 
@@ -208,20 +277,18 @@ class Game:
             self.game_settings["music_volume"] = self.music_slider.val
             self.update_volumes()
         elif self.state == "in_game" and self.game_instance:
-            self.game_instance.update()
+            self.game_instance.advance(self.frame_ms, self.game_speed)
 
     def draw(self):
-        self.screen.fill(BLACK)
-        if self.state == "main_menu":
-            self.draw_background("assets/images/backgrounds/main_menu_background.png")
-            self.draw_main_menu()
-        elif self.state == "level_select":
-            self.draw_background("assets/images/backgrounds/level_select_background.png")
-            self.draw_level_select()
-        elif self.state == "settings":
-            self.draw_background("assets/images/backgrounds/settings_background.png")
-            self.draw_settings()
-        elif self.state in ["in_game", "pause", "win", "game_over"]:
+        dirty_allowed = self.renderer.begin_frame((self.state, self.game_instance))
+        if self.state in self.menu_layers:
+            self.draw_menu(dirty_allowed)
+            return
+        if dirty_allowed and self.state == "in_game" and self.game_instance:
+            self.draw_in_game_dirty()
+            return
+        if self.state in ["in_game", "pause", "win", "game_over"]:
+            self.screen.fill(BLACK)
             if self.game_instance:
                 self.game_instance.draw(self.screen)
                 self.draw_game_hud()
@@ -231,35 +298,98 @@ class Game:
                 self.draw_pause_menu()
             elif self.state == "game_over": 
                 self.draw_game_over()
-        pygame.display.flip()
+        self.draw_profiler_overlay()
+        with profiler.section("flip"):
+            self.renderer.present()
+
+    def draw_in_game_dirty(self):
+        rects = self.game_instance.draw_dirty(self.screen, self.hud_overlay_rects + self.profiler_rects)
+        with profiler.section("hud"):
+            rects.extend(self.draw_hud_overlays())
+            if self.get_hud_panel_key() != self.hud_panel_key:
+                rects.append(self.draw_hud_panel())
+        rects.extend(self.draw_profiler_overlay())
+        with profiler.section("flip"):
+            self.renderer.present(rects)
+
+    def draw_profiler_overlay(self):
+        # Прямоугольник оверлея восстанавливается из слоя поля в следующем кадре
+        self.profiler_rects = [profiler.draw_overlay(self.screen, (GAME_AREA_WIDTH - 10, 10), 1000 / FPS)] if profiler.enabled else []
+        return self.profiler_rects
+
+    def toggle_profiler(self):
+        profiler.toggle()
+        self.renderer.invalidate()
+
+    def dump_profile(self):
+        if not profiler.frames:
+            print("Профайлер пуст: включите его клавишей F3")
+            return
+        path = os.path.join(PROFILE_DIR, time.strftime("trace_%Y%m%d_%H%M%S.json"))
+        try:
+            events = profiler.export_chrome_trace(path)
+            print(f"Трасса сохранена: {path} ({events} событий, открыть в chrome://tracing)")
+        except OSError as e:
+            print(f"Error: Failed to save trace: {e}")
+
+    def draw_menu(self, dirty_allowed):
+        layer = self.menu_layers[self.state]
+        background = self.get_menu_background(self.menu_backgrounds[self.state])
+        if not dirty_allowed:
+            self.screen.blit(background, (0, 0))
+            layer.invalidate()
+            layer.draw(self.screen)
+            self.draw_profiler_overlay()
+            with profiler.section("flip"):
+                self.renderer.present()
+            return
+        # Неизменившиеся виджеты не перерисовываются, фон под остальными восстанавливается из кэша
+        damaged = self.profiler_rects
+        for rect in damaged:
+            self.screen.blit(background, rect, rect)
+        rects = damaged + layer.draw(self.screen, background, damaged)
+        rects.extend(self.draw_profiler_overlay())
+        with profiler.section("flip"):
+            self.renderer.present(rects)
 
-    def draw_background(self, image_path):
+    def get_menu_background(self, image_path):
         try:
-            pil_image = Image.open(image_path)
-            blurred_image = pil_image.filter(ImageFilter.GaussianBlur(radius=5))
-            blurred_image = blurred_image.resize((SCREEN_WIDTH, SCREEN_HEIGHT), Image.LANCZOS)
-            mode = blurred_image.mode
-            size = blurred_image.size
-            data = blurred_image.tobytes()
-            pygame_image = pygame.image.fromstring(data, size, mode).convert()
-            self.screen.blit(pygame_image, (0, 0))
-        except pygame.error:
-            self.screen.fill(GREY)
+            return self.background_cache.get(image_path, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        except (pygame.error, OSError):
+            if self.fallback_background is None:
+                self.fallback_background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+                self.fallback_background.fill(GREY)
+            return self.fallback_background
 
     def draw_game_hud(self):
+        with profiler.section("hud"):
+            self.draw_hud_panel()
+            if self.game_instance:
+                self.draw_hud_overlays()
+
+    def get_hud_panel_key(self):
+        level = self.game_instance
+        mouse_pos = pygame.mouse.get_pos()
+        tower = self.selected_tower
+        tower_key = (id(tower), tuple(tower.upgrade_levels.values())) if tower else None
+        return (level.health, level.money, level.state, level.wave_index, tower_key, self.get_speed_label(),
+                mouse_pos if mouse_pos[0] >= GAME_AREA_WIDTH else None)
+
+    def draw_hud_panel(self):
         panel_rect = pygame.Rect(GAME_AREA_WIDTH, 0, RIGHT_PANEL_WIDTH, SCREEN_HEIGHT)
         pygame.draw.rect(self.screen, PANEL_COLOR, panel_rect)
         if not self.game_instance: 
-            return
+            return panel_rect
+        self.hud_panel_key = self.get_hud_panel_key()
         heart_pos = (GAME_AREA_WIDTH + 40, 40)
         heart_img = settings.UI_IMAGES.get("heart", pygame.Surface((30, 30), pygame.SRCALPHA))
         self.screen.blit(heart_img, heart_img.get_rect(center=heart_pos))
-        health_text = FONT_MAIN.render(f"{self.game_instance.health}", True, WHITE)
+        health_text = render_text(FONT_MAIN, f"{self.game_instance.health}", WHITE)
         self.screen.blit(health_text, (heart_pos[0] + 30, heart_pos[1] - 20))
         coin_pos = (GAME_AREA_WIDTH + 40, 90)
         coin_img = settings.UI_IMAGES.get("coin", pygame.Surface((30, 30), pygame.SRCALPHA))
         self.screen.blit(coin_img, coin_img.get_rect(center=coin_pos))
-        money_text = FONT_MAIN.render(f"{self.game_instance.money}", True, WHITE)
+        money_text = render_text(FONT_MAIN, f"{self.game_instance.money}", WHITE)
         self.screen.blit(money_text, (coin_pos[0] + 30, coin_pos[1] - 20))
         
         if self.selected_tower: 
@@ -270,23 +400,49 @@ class Game:
         
         if self.game_instance.state == "between_waves" and self.game_instance.wave_index < len(self.game_instance.waves):
             self.start_wave_button.draw(self.screen)
-        
-        wave_panel_rect = pygame.Rect(10, 10, 240, 50)
-        pygame.draw.rect(self.screen, PANEL_COLOR, wave_panel_rect, border_radius=10)
+        self.speed_button.set_text(self.get_speed_label())
+        self.speed_button.draw(self.screen)
+        return panel_rect
+
+    def get_speed_label(self):
+        level = self.game_instance
+        # Если кадр не вмещает все тики, показываем фактическую скорость
+        if level and self.game_speed > 1 and level.effective_speed < self.game_speed * 0.9:
+            return f"x{self.game_speed:g} (x{level.effective_speed:.1f})"
+        return f"Скорость x{self.game_speed:g}"
+
+    def cycle_game_speed(self):
+        speeds = GAME_SPEEDS
+        self.game_speed = speeds[(speeds.index(self.game_speed) + 1) % len(speeds)] if self.game_speed in speeds else speeds[0]
+        if self.game_instance: self.game_instance.effective_speed = float(self.game_speed)
+
+    def draw_hud_overlays(self):
+        pygame.draw.rect(self.screen, PANEL_COLOR, self.wave_panel_rect, border_radius=10)
         wave_text_str = f"Ур. {self.game_instance.level_num} | Волна: {self.game_instance.wave_index}/{len(self.game_instance.waves)}"
-        wave_text = FONT_SMALL.render(wave_text_str, True, WHITE)
-        self.screen.blit(wave_text, wave_text.get_rect(center=wave_panel_rect.center))
+        wave_text = render_text(FONT_SMALL, wave_text_str, WHITE)
+        text_rect = self.screen.blit(wave_text, wave_text.get_rect(center=self.wave_panel_rect.center))
         settings_gear_img = settings.UI_IMAGES.get("settings_gear", pygame.Surface((10, 10), pygame.SRCALPHA))
         self.screen.blit(settings_gear_img, self.settings_icon_rect)
+        self.hud_overlay_rects = [self.wave_panel_rect.union(text_rect), self.settings_icon_rect]
+        return self.hud_overlay_rects
 
     def draw_tower_control_panel(self):
         tower = self.selected_tower
         panel_x = GAME_AREA_WIDTH + RIGHT_PANEL_WIDTH // 2
         tower_names = {"archer": "Лучник", "cannon": "Пушка", "mage": "Маг"}
         title_text = f"Башня: {tower_names[tower.tower_type]}"
-        title_surf = FONT_SMALL.render(title_text, True, WHITE)
+        title_surf = render_text(FONT_SMALL, title_text, WHITE)
         self.screen.blit(title_surf, title_surf.get_rect(center=(panel_x, 150)))
-        
+
+        signature = (tower, tuple(tower.upgrade_levels.values()), self.game_instance.money)
+        if signature != self.tower_panel_signature:
+            self.tower_panel_signature = signature
+            self.refresh_tower_control_buttons()
+        for btn in self.tower_control_buttons.values():
+            btn.draw(self.screen)
+
+    def refresh_tower_control_buttons(self):
+        tower = self.selected_tower
         stats = ['damage', 'fire_rate', 'range']
         for stat in stats:
             btn = self.tower_control_buttons[f"upgrade_{stat}"]
@@ -294,57 +450,25 @@ class Game:
             stat_rus = {"damage": "Урон", "fire_rate": "Скорость", "range": "Дальность"}[stat]
             if level < MAX_UPGRADE_LEVEL:
                 cost = tower.get_upgrade_cost(stat)
-                btn.text = f"{stat_rus} ({cost})" if cost is not None else f"{stat_rus} (Ошибка)"
+                btn.set_text(f"{stat_rus} ({cost})" if cost is not None else f"{stat_rus} (Ошибка)")
                 can_afford = self.game_instance.money >= cost if cost is not None else False
                 btn.color = BLUE if can_afford else GREY
                 btn.hover_color = btn.color
             else:
-                btn.text = f"{stat_rus} (МАКС)"
+                btn.set_text(f"{stat_rus} (МАКС)")
                 btn.color = btn.hover_color = BUTTON_LOCKED_COLOR
-            btn.text_surface = btn.font.render(btn.text, True, WHITE)  
-            btn.draw(self.screen)
 
         sell_btn = self.tower_control_buttons["sell"]
         sell_price = tower.get_sell_price()
-        sell_btn.text = f"Продать ({sell_price})" if sell_price is not None else "Продать (Ошибка)"
-        sell_btn.text_surface = sell_btn.font.render(sell_btn.text, True, WHITE)  
-        sell_btn.draw(self.screen)
-
-    def draw_main_menu(self):
-        title_text = "Защита королевства"
-        title_font = pygame.font.SysFont("arial", 60)
-        title_surf = title_font.render(title_text, True, WHITE)
-        title_rect = title_surf.get_rect(center=(SCREEN_WIDTH // 2, 100))
-        self.screen.blit(title_surf, title_rect)
-        for btn in self.main_menu_buttons: 
-            btn.draw(self.screen)
-
-    def draw_level_select(self):
-        self.setup_level_buttons()
-        for button in self.level_select_buttons:
-            button.draw(self.screen)
-            if hasattr(button, 'stars'):
-                for i in range(3):
-                    star_img = settings.UI_IMAGES.get("star", pygame.Surface((25, 25), pygame.SRCALPHA)) if i < button.stars else settings.UI_IMAGES.get("star_empty", pygame.Surface((25, 25), pygame.SRCALPHA))
-                    self.screen.blit(star_img, (button.rect.left + i * 30 + 35, button.rect.bottom + 5))
-            
-    def draw_settings(self):
-        self.music_slider.draw(self.screen)
-        self.sfx_slider.draw(self.screen)
-        music_text = FONT_SMALL.render("Громкость музыки", True, WHITE)
-        self.screen.blit(music_text, (self.music_slider.rect.centerx - music_text.get_width()//2, self.music_slider.rect.y - 40))
-        sfx_text = FONT_SMALL.render("Громкость эффектов", True, WHITE)
-        self.screen.blit(sfx_text, (self.sfx_slider.rect.centerx - sfx_text.get_width()//2, self.sfx_slider.rect.y - 40))
-        for button in self.settings_buttons: 
-            button.draw(self.screen)
+        sell_btn.set_text(f"Продать ({sell_price})" if sell_price is not None else "Продать (Ошибка)")
 
     def draw_overlay(self, title, title_color, subtitle):
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 180))
         self.screen.blit(overlay, (0, 0))
-        title_surf = FONT_MAIN.render(title, True, title_color)
+        title_surf = render_text(FONT_MAIN, title, title_color)
         self.screen.blit(title_surf, title_surf.get_rect(center=(SCREEN_WIDTH // 2, 300)))
-        sub_surf = FONT_SMALL.render(subtitle, True, WHITE)
+        sub_surf = render_text(FONT_SMALL, subtitle, WHITE)
         self.screen.blit(sub_surf, sub_surf.get_rect(center=(SCREEN_WIDTH // 2, 400)))
         
     def draw_pause_menu(self): 
@@ -355,13 +479,76 @@ class Game:
     def draw_game_over(self): 
         self.draw_overlay("Игра окончена", RED, "Нажмите любую кнопку, чтобы продолжить")
     
-    def start_level(self, level_num):
+    def start_level(self, level_num, record=RECORD_REPLAYS):
         from level import GameLevel
+        self.leave_level()
         self.game_instance = GameLevel(level_num, self)
+        self.game_instance.autosave = self.autosave_level
+        self.game_speed = 1
+        self.state = "in_game"
+        self.selected_tower = None
+        self.selected_tower_type = None
+        if record:
+            prune_replays(REPLAY_KEEP - 1)
+            try:
+                self.game_instance.recorder = ReplayRecorder(replay_path(level_num), level_num, self.game_instance.waves)
+            except OSError:
+                print("Error: Failed to create replay file.")
+
+    def start_replay(self, replay, speed=1):
+        self.start_level(replay.level_num, record=False)
+        self.game_instance.replay = ReplayPlayer(replay)
+        self.game_instance.autosave = None
+        self.game_speed = speed
+
+    def continue_saved_game(self):
+        # Файл мог ещё дописываться в фоне
+        self.save_writer.wait()
+        try:
+            level = savegame.load(SAVE_PATH, self)
+        except (OSError, ValueError, IndexError, KeyError, struct.error) as e:
+            print(f"Error: Failed to load saved game: {e}")
+            self.discard_save()
+            return
+        # Продолженная партия не пишется в повтор: запись началась бы с середины
+        level.autosave = self.autosave_level
+        self.game_instance = self.saved_level = level
+        self.game_speed = 1
         self.state = "in_game"
         self.selected_tower = None
         self.selected_tower_type = None
 
+    def autosave_level(self, level):
+        # Снимок снимается здесь, на диск его пишет фоновый поток
+        self.save_writer.submit(SAVE_PATH, savegame.snapshot(level))
+        self.saved_level = level
+        if not self.has_save:
+            self.has_save = True
+            self.setup_main_menu_buttons()
+
+    def discard_save(self):
+        self.save_writer.submit(SAVE_PATH, None)
+        self.saved_level = None
+        if self.has_save:
+            self.has_save = False
+            self.setup_main_menu_buttons()
+
+    def leave_level(self):
+        level = self.game_instance
+        if level and level.autosave:
+            if self.state not in ("win", "game_over"):
+                self.autosave_level(level)
+            elif self.saved_level is level:
+                # Законченный уровень продолжать нечего
+                self.discard_save()
+        sounds.clear()
+        self.close_replay()
+
+    def close_replay(self):
+        if self.game_instance and self.game_instance.recorder:
+            self.game_instance.recorder.close(self.game_instance.tick)
+            self.game_instance.recorder = None
+
     def trigger_wave_start(self):
         if self.game_instance: 
             self.game_instance.trigger_next_wave()
@@ -370,24 +557,24 @@ class Game:
         if self.selected_tower and self.game_instance:
             self.game_instance.sell_tower(self.selected_tower)
             self.selected_tower = None
-            if SELL_SOUND: 
-                SELL_SOUND.play()
+            sounds.play(SELL_SOUND)
 
     def upgrade_selected_tower(self, stat_name):
         if self.selected_tower and self.game_instance:
             self.game_instance.upgrade_tower(self.selected_tower, stat_name)
 
     def go_to_level_select(self):
+        self.leave_level()
         self.state = "level_select"
         self.game_instance = None
         self.selected_tower = None
         self.selected_tower_type = None
-        self.setup_level_buttons()
         
     def exit_to_level_select(self):
         self.pending_state = "level_select"
         
     def go_to_main_menu(self): 
+        self.leave_level()
         self.state = "main_menu"
         self.game_instance = None
         self.selected_tower = None
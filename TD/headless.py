@@ -0,0 +1,128 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Баннер pygame в stdout сломал бы JSON-сводку
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import json
+import time
+import argparse
+import settings
+from level import GameLevel
+
+class HeadlessController:
+    def __init__(self):
+        self.state = "in_game"
+        self.selected_tower_type = None
+        self.selected_tower = None
+
+    def get_unlocked_level(self):
+        return max(settings.LEVELS_CONFIG.keys())
+
+    def save_progress(self, level_num, stars):
+        pass
+
+    def exit_to_level_select(self):
+        pass
+
+    def start_level(self, level_num):
+        pass
+
+def setup_headless(use_enemy_engine=None, use_projectile_engine=None):
+    settings.load_images(headless=True)
+    settings.update_unit_data()
+    if use_enemy_engine is not None:
+        settings.USE_ENEMY_ENGINE = use_enemy_engine
+    if use_projectile_engine is not None:
+        settings.USE_PROJECTILE_ENGINE = use_projectile_engine
+
+def load_plan(path):
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def apply_plan_actions(level, plan, wave_index, towers_by_index, failed_actions):
+    for index, action in enumerate(plan.get("towers", [])):
+        if action.get("wave", 0) == wave_index:
+            tower = level.build_tower(action["type"], tuple(action["pos"]))
+            if tower:
+                towers_by_index[index] = tower
+            else:
+                failed_actions.append({"action": "place", "index": index, "wave": wave_index})
+    for action in plan.get("upgrades", []):
+        if action.get("wave", 0) == wave_index:
+            tower = towers_by_index.get(action["tower"])
+            if not tower or not tower.alive() or not level.upgrade_tower(tower, action["stat"]):
+                failed_actions.append({"action": "upgrade", "tower": action["tower"], "stat": action["stat"], "wave": wave_index})
+    for action in plan.get("sell", []):
+        if action.get("wave", 0) == wave_index:
+            tower = towers_by_index.pop(action["tower"], None)
+            if tower and tower.alive():
+                level.sell_tower(tower)
+            else:
+                failed_actions.append({"action": "sell", "tower": action["tower"], "wave": wave_index})
+
+def run_simulation(level_num, plan=None, max_ticks=1_000_000, waves=None):
+    plan = plan or {}
+    controller = HeadlessController()
+    level = GameLevel(level_num, controller, headless=True, waves=waves)
+    towers_by_index = {}
+    failed_actions = []
+    gold_curve = [{"wave": 0, "tick": 0, "money": level.money}]
+
+    started = time.perf_counter()
+    while controller.state == "in_game" and level.tick < max_ticks:
+        if level.state == "between_waves":
+            if level.tick and gold_curve[-1]["wave"] != level.wave_index:
+                gold_curve.append({"wave": level.wave_index, "tick": level.tick, "money": level.money})
+            apply_plan_actions(level, plan, level.wave_index, towers_by_index, failed_actions)
+            level.trigger_next_wave()
+        level.update()
+    elapsed = time.perf_counter() - started
+
+    won = controller.state == "win"
+    if won:
+        gold_curve.append({"wave": level.wave_index, "tick": level.tick, "money": level.money})
+        waves_cleared = len(level.waves)
+    else:
+        waves_cleared = level.wave_index - (1 if level.state == "wave_in_progress" else 0)
+    result = "win" if won else ("game_over" if controller.state == "game_over" else "timeout")
+    return {
+        "level": level_num,
+        "result": result,
+        "waves_cleared": waves_cleared,
+        "waves_total": len(level.waves),
+        "lives_left": level.health,
+        "stars": level.calculate_stars() if won else 0,
+        "money": level.money,
+        "enemies_killed": level.enemies_killed,
+        "gold_curve": gold_curve,
+        "failed_actions": failed_actions,
+        "ticks": level.tick,
+        "sim_seconds": round(level.sim_time / 1000, 3),
+        "wall_seconds": round(elapsed, 3),
+        "ticks_per_second": round(level.tick / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Прогон уровня без окна и звука")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--plan", help="JSON с планом расстановки башен")
+    parser.add_argument("--max-ticks", type=int, default=1_000_000)
+    parser.add_argument("--enemy-engine", action="store_true", help="векторный движок врагов")
+    parser.add_argument("--projectile-engine", action="store_true", help="векторный движок снарядов (включает движок врагов)")
+    parser.add_argument("--output", help="куда записать JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    setup_headless(use_enemy_engine=args.enemy_engine or None, use_projectile_engine=args.projectile_engine or None)
+    summary = run_simulation(args.level, load_plan(args.plan), args.max_ticks)
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,75 @@
 import pygame
+import settings
 from settings import *
 from enemies import Enemy
-from towers import Tower
-from ui import Button
+from enemy_engine import EnemyEngine, EngineEnemy
+from projectiles import Projectile
+from projectile_engine import ProjectileEngine
+from pools import EntityGroup, EntityPool
+from towers import Tower, range_overlay, preview_image
+from ui import Button, render_text
 from decorations import Decoration
+from spatial import SpatialHash
+from placement import OccupancyGrid
+from paths import compile_path
+from waves import compile_wave, EMPTY_TIMELINE
+from profiler import profiler
+from sound import sounds
 import math
+import time
 
 class GameLevel:
-    def __init__(self, level_num, game_controller):
+    def __init__(self, level_num, game_controller, use_enemy_engine=None, headless=False, waves=None, use_projectile_engine=None):
         self.game_controller = game_controller
+        self.headless = headless
         self.level_num = level_num
         self.config = LEVELS_CONFIG[level_num]
-        self.game_area = pygame.Surface((GAME_AREA_WIDTH, SCREEN_HEIGHT))
+        self.area_rect = pygame.Rect(0, 0, GAME_AREA_WIDTH, SCREEN_HEIGHT)
 
         self.path = self.config["path"]
-        self.waves = self.config["waves"]
+        self.compiled_path = compile_path(self.path)
+        self.waves = waves if waves is not None else self.config["waves"]
+        # Волны раскладываются в шкалы спавна один раз при загрузке уровня
+        self.timelines = [compile_wave(wave) for wave in self.waves]
         
         self.start_health = 20; self.health = self.start_health
         self.money = 500
         self.wave_index = 0
         self.enemies_killed = 0
-        self.start_time = pygame.time.get_ticks()
+        self.tick = 0; self.sim_time = 0.0
+        self.tick_accumulator = 0.0; self.interpolation = 1.0
+        self.effective_speed = 1.0
+        self.start_time = self.sim_time
 
-        self.enemies_to_spawn = []; self.state = "between_waves"
-        self.enemies = pygame.sprite.Group(); self.towers = pygame.sprite.Group(); self.projectiles = pygame.sprite.Group()
+        self.spawn_timeline = EMPTY_TIMELINE; self.spawn_cursor = 0; self.wave_start_tick = 0
+        self.state = "between_waves"
+        if use_enemy_engine is None: use_enemy_engine = settings.USE_ENEMY_ENGINE
+        if use_projectile_engine is None: use_projectile_engine = settings.USE_PROJECTILE_ENGINE
+        # Движок снарядов адресует цели по слотам движка врагов
+        if use_projectile_engine: use_enemy_engine = True
+        self.enemy_engine = EnemyEngine(self.compiled_path) if use_enemy_engine else None
+        self.projectile_engine = ProjectileEngine(self.enemy_engine) if use_projectile_engine else None
+        # Враги и снаряды живут в пулах: убитые экземпляры переиспользуются
+        self.enemies = EntityGroup(EntityPool(EngineEnemy if use_enemy_engine else Enemy))
+        self.projectiles = self.projectile_engine if use_projectile_engine else EntityGroup(EntityPool(Projectile))
+        self.towers = pygame.sprite.Group()
+        self.towers_by_id = {}; self.next_tower_id = 1
+        # Запись действий игрока и воспроизведение записи (replay.py)
+        self.recorder = None; self.replay = None
+        # Вызывается после каждой завершённой волны (сохранение партии в game.py)
+        self.autosave = None
         self.decorations = pygame.sprite.Group()
+        self.enemy_grid = SpatialHash(ENEMY_GRID_CELL_SIZE)
         
         self._create_path_hitbox()
         self._load_decorations()
+        self._build_occupancy()
         self._load_road_segments()
+        self._build_static_layer()
         self.setup_win_screen_ui()
 
     def setup_win_screen_ui(self):
+        if self.headless: return
         next_level_exists = (self.level_num + 1) in LEVELS_CONFIG
         max_unlocked = self.game_controller.get_unlocked_level()
         next_level_unlocked = (self.level_num + 1) <= max_unlocked
@@ -62,90 +100,198 @@ class GameLevel:
                 decor_obj = Decoration(image, pos)
                 self.decorations.add(decor_obj)
 
+    def _build_occupancy(self):
+        # Дорога и декорации неподвижны, башни добавляются и снимаются по ходу игры
+        self.occupancy = OccupancyGrid(GAME_AREA_WIDTH, SCREEN_HEIGHT)
+        self.show_heatmap = False
+        for rect in self.path_rects: self.occupancy.add_rect(rect)
+        for decor in self.decorations: self.occupancy.add_rect(decor.rect)
+        for tower in self.towers: self.occupancy.add_rect(tower.rect)
+
     def _load_road_segments(self):
         self.road_segments = self.config.get("road_segments", [])
 
+    def _build_static_layer(self):
+        if self.headless: return
+        # Фон, дорога и декорации не меняются во время уровня - рисуем их один раз
+        self.static_layer = pygame.Surface((GAME_AREA_WIDTH, SCREEN_HEIGHT)).convert()
+        self.static_layer.fill(self.config["bg_color"])
+        for segment in self.road_segments:
+            road_img = ROAD_IMAGES.get(segment["type"], None)
+            if road_img:
+                self.static_layer.blit(road_img, segment["center_left"])
+        self.decorations.draw(self.static_layer)
+        self._build_board_layer()
+
+    def _build_board_layer(self):
+        # Статичный слой + башни: из него восстанавливаются грязные области кадра
+        self.board_layer = self.static_layer.copy()
+        if self.show_heatmap: self.board_layer.blit(self.occupancy.heatmap(PLACEMENT_RADIUS), (0, 0))
+        self.towers.draw(self.board_layer)
+        self.dynamic_rects = [self.area_rect.copy()]
+
+    def invalidate_tower(self, tower):
+        if self.headless: return
+        # Карта допустимых мест меняется вокруг башни, проще пересобрать слой целиком
+        if self.show_heatmap: return self._build_board_layer()
+        self.board_layer.blit(self.static_layer, tower.rect, tower.rect)
+        for other in self.towers:
+            if other.rect.colliderect(tower.rect):
+                self.board_layer.blit(other.image, other.rect)
+        self.dynamic_rects.append(tower.rect.copy())
+
+    def toggle_heatmap(self):
+        self.show_heatmap = not self.show_heatmap
+        if not self.headless: self._build_board_layer()
+
+    def add_tower(self, tower):
+        tower.tower_id = self.next_tower_id; self.next_tower_id += 1
+        self.towers_by_id[tower.tower_id] = tower
+        self.towers.add(tower); self.occupancy.add_rect(tower.rect)
+        self.invalidate_tower(tower)
+
     def trigger_next_wave(self):
         if self.state == "between_waves" and self.wave_index < len(self.waves):
             self.state = "wave_in_progress"
-            wave_data = self.waves[self.wave_index]
-            self.enemies_to_spawn = []
-            for enemy_type, count in wave_data.items():
-                for _ in range(count):
-                    self.enemies_to_spawn.append(enemy_type)
+            self.spawn_timeline = self.timelines[self.wave_index]
+            self.spawn_cursor = 0
+            self.wave_start_tick = self.tick
             self.wave_index += 1
-            self.wave_spawn_timer = pygame.time.get_ticks()
+            if self.recorder: self.recorder.on_wave(self.tick)
+            return True
+        return False
+
+    def advance(self, frame_ms, speed=1, budget_ms=SIM_FRAME_BUDGET_MS):
+        # Фиксированный шаг симуляции; отрисовка интерполирует между тиками.
+        # Ускорение - это больше тиков за кадр, сам шаг не меняется
+        self.tick_accumulator += frame_ms * speed
+        max_ticks = math.ceil(MAX_SIM_TICKS_PER_FRAME * speed)
+        started = time.perf_counter()
+        ticks = 0
+        while self.tick_accumulator >= SIM_TICK_MS and self.game_controller.state == "in_game":
+            # Не успели за бюджет кадра - отставание выбрасываем, фактическая скорость падает
+            if ticks == max_ticks or (ticks and (time.perf_counter() - started) * 1000 > budget_ms):
+                self.tick_accumulator = 0.0
+                break
+            self.update()
+            self.tick_accumulator -= SIM_TICK_MS
+            ticks += 1
+        self.interpolation = self.tick_accumulator / SIM_TICK_MS
+        if frame_ms > 0:
+            self.effective_speed += (ticks * SIM_TICK_MS / frame_ms - self.effective_speed) * 0.1
 
     def update(self):
-        if self.state == "wave_in_progress": self.spawn_enemies()
-        self.enemies.update()
-        self.towers.update(self.enemies, self.projectiles)
-        self.projectiles.update()
-        self.decorations.update()
+        if self.replay is not None: self.replay.apply(self)
+        with profiler.section("spawn"):
+            if self.state == "wave_in_progress": self.spawn_enemies()
+        with profiler.section("enemies"):
+            if self.enemy_engine: self.enemy_engine.step(self.sim_time)
+            else: self.enemies.update()
+        with profiler.section("grid"):
+            self.rebuild_enemy_grid()
+        with profiler.section("towers"):
+            self.towers.update(self.enemy_grid, self.projectiles, self.sim_time)
+        with profiler.section("projectiles"):
+            self.projectiles.update()
+            self.enemies.compact(); self.projectiles.compact()
+        with profiler.section("decorations"):
+            self.decorations.update()
         
-        if self.state == "wave_in_progress" and not self.enemies_to_spawn and not self.enemies:
+        if self.state == "wave_in_progress" and self.spawn_cursor >= len(self.spawn_timeline) and not self.enemies:
             if self.wave_index >= len(self.waves):
-                self.end_time = pygame.time.get_ticks()
+                self.end_time = self.sim_time
                 self.game_controller.save_progress(self.level_num, self.calculate_stars())
                 self.setup_win_screen_ui()
                 self.game_controller.state = "win"
             else:
                 self.state = "between_waves"
+                if self.autosave: self.autosave(self)
                 
         if self.health <= 0:
             self.game_controller.state = "game_over"
+        self.tick += 1
+        self.sim_time = self.tick * SIM_TICK_MS
+
+    def rebuild_enemy_grid(self):
+        engine = self.enemy_engine
+        if engine is None:
+            items = ((enemy, enemy.pos.x, enemy.pos.y, enemy.path_progress) for enemy in self.enemies)
+        else:
+            # Координаты берутся из массивов движка, а не через свойства каждого врага
+            n = engine.count
+            xs = engine.x[:n].tolist(); ys = engine.y[:n].tolist(); progress = engine.progress[:n].tolist()
+            items = ((enemy, xs[enemy.slot], ys[enemy.slot], progress[enemy.slot]) for enemy in self.enemies)
+        self.enemy_grid.rebuild(items)
 
     def spawn_enemies(self):
-        spawn_interval = 500
-        if self.enemies_to_spawn and pygame.time.get_ticks() - self.wave_spawn_timer > spawn_interval:
-            enemy_type = self.enemies_to_spawn.pop(0)
-            new_enemy = Enemy(enemy_type, self.path, self)
-            self.enemies.add(new_enemy)
-            self.wave_spawn_timer = pygame.time.get_ticks()
+        # За тик выходят все, чьё время уже наступило, - и при частых спавнах, и при ускорении
+        ticks = self.spawn_timeline.ticks; types = self.spawn_timeline.types
+        elapsed = self.tick - self.wave_start_tick
+        cursor = self.spawn_cursor
+        while cursor < len(ticks) and ticks[cursor] <= elapsed:
+            self.enemies.add(self.create_enemy(types[cursor]))
+            cursor += 1
+        self.spawn_cursor = cursor
+
+    def create_enemy(self, enemy_type):
+        return self.enemies.pool.acquire(enemy_type, self.path, self)
 
     def draw(self, surface):
-        self.game_area.fill(self.config["bg_color"])
-        
-        # Рендеринг пути с изображениями
-        for i, segment in enumerate(self.road_segments):
-            road_key = segment["type"]
-            center_left = pygame.math.Vector2(segment["center_left"])
-            road_img = ROAD_IMAGES.get(road_key, None)
-            if road_img:
-                # Определяем конец сегмента в зависимости от типа
-                if road_key in ["road_1_1", "road_1_3", "road_1_5", "road_1_7"]:  # Горизонтальные сегменты
-                    end_x = center_left.x + 100
-                    end_y = center_left.y
-                else:  # Вертикальные сегменты (road_1_2, road_1_4, road_1_6)
-                    end_x = center_left.x
-                    end_y = center_left.y + 100
-                # Рендеринг без поворота
-                self.game_area.blit(road_img, (center_left.x, center_left.y))
-
-        # Рендеринг декораций
-        self.decorations.draw(self.game_area)
-        
+        surface.set_clip(self.area_rect)
+        with profiler.section("board"):
+            surface.blit(self.board_layer, (0, 0))
+        self.draw_dynamic(surface)
+        surface.set_clip(None)
+
+    def draw_dirty(self, surface, extra_rects=()):
+        surface.set_clip(self.area_rect)
+        dirty = self.dynamic_rects + [rect.clip(self.area_rect) for rect in extra_rects]
+        with profiler.section("board"):
+            for rect in dirty:
+                surface.blit(self.board_layer, rect, rect)
+        self.draw_dynamic(surface)
+        surface.set_clip(None)
+        return dirty + self.dynamic_rects
+
+    def draw_dynamic(self, surface):
+        rects = []
         mouse_pos = pygame.mouse.get_pos()
+        ranged_towers = []
         if self.game_controller.selected_tower_type is None and self.game_controller.selected_tower is None:
-            for tower in self.towers:
-                if tower.rect.collidepoint(mouse_pos): tower.draw_range(self.game_area)
-        if self.game_controller.selected_tower: self.game_controller.selected_tower.draw_range(self.game_area)
-
-        self.towers.draw(self.game_area)
-        self.projectiles.draw(self.game_area)
-        for enemy in self.enemies:
-            self.game_area.blit(enemy.image, enemy.rect)
-            enemy.draw_health_bar(self.game_area)
-
-        self.draw_tower_preview(self.game_area)
-        surface.blit(self.game_area, (0, 0))
+            ranged_towers = [tower for tower in self.towers if tower.rect.collidepoint(mouse_pos)]
+        if self.game_controller.selected_tower: ranged_towers.append(self.game_controller.selected_tower)
+        with profiler.section("ranges"):
+            for ranged_tower in ranged_towers:
+                range_rect = ranged_tower.draw_range(surface)
+                # Круг дальности рисуется под башнями
+                for tower in self.towers:
+                    if tower.rect.colliderect(range_rect): surface.blit(tower.image, tower.rect)
+                rects.append(range_rect)
+
+        alpha = self.interpolation
+        with profiler.section("projectiles"):
+            if self.projectile_engine is not None:
+                rects.extend(self.projectile_engine.draw(surface, alpha))
+            else:
+                for projectile in self.projectiles:
+                    rects.append(projectile.draw(surface, alpha))
+        with profiler.section("enemies"):
+            if self.enemy_engine is not None:
+                rects.extend(self.enemy_engine.draw(surface, alpha))
+            else:
+                for enemy in self.enemies:
+                    rects.append(enemy.draw(surface, alpha))
+
+        with profiler.section("preview"):
+            rects.extend(self.draw_tower_preview(surface))
+        self.dynamic_rects = [rect.clip(self.area_rect) for rect in rects]
         
     def draw_win_screen(self, surface):
         rect = pygame.Rect(0, 0, 500, 450); rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
         pygame.draw.rect(surface, PANEL_COLOR, rect, border_radius=15)
         pygame.draw.rect(surface, WHITE, rect, 2, border_radius=15)
 
-        title_surf = FONT_MAIN.render("Уровень пройден!", True, GREEN)
+        title_surf = render_text(FONT_MAIN, "Уровень пройден!", GREEN)
         surface.blit(title_surf, title_surf.get_rect(center=(rect.centerx, rect.top + 50)))
 
         stars = self.calculate_stars()
@@ -153,10 +299,10 @@ class GameLevel:
             star_img = UI_IMAGES["star"] if i < stars else UI_IMAGES["star_empty"]
             surface.blit(star_img, star_img.get_rect(center=(rect.centerx - 50 + i * 50, rect.top + 120)))
 
-        time_spent = (self.end_time - self.start_time) // 1000
+        time_spent = int(self.end_time - self.start_time) // 1000
         stats = [ f"Осталось жизней: {self.health} / {self.start_health}", f"Убито врагов: {self.enemies_killed}", f"Время: {time_spent // 60}м {time_spent % 60}с" ]
         for i, stat_text in enumerate(stats):
-            stat_surf = FONT_SMALL.render(stat_text, True, WHITE)
+            stat_surf = render_text(FONT_SMALL, stat_text, WHITE)
             surface.blit(stat_surf, stat_surf.get_rect(center=(rect.centerx, rect.top + 200 + i * 40)))
             
         self.win_screen_buttons["menu"].draw(surface)
@@ -170,45 +316,50 @@ class GameLevel:
     def draw_tower_preview(self, surface):
         if self.game_controller.selected_tower_type:
             mouse_pos = pygame.mouse.get_pos()
-            if mouse_pos[0] >= GAME_AREA_WIDTH: return
+            if mouse_pos[0] >= GAME_AREA_WIDTH: return []
             can_place = self.check_placement_legality(mouse_pos)
-            data = TOWER_DATA[self.game_controller.selected_tower_type]
-            tower_img = data["image"].copy()
-            preview_color = (0, 255, 0, 150) if can_place else (255, 0, 0, 150)
-            tower_img.fill(preview_color, special_flags=pygame.BLEND_RGBA_MULT)
-            rect = tower_img.get_rect(center=mouse_pos)
-            surface.blit(tower_img, rect)
-            range_val = data["range"]
-            range_surface = pygame.Surface((range_val * 2, range_val * 2), pygame.SRCALPHA)
-            pygame.draw.circle(range_surface, (255, 255, 255, 100), (range_val, range_val), range_val, 1)
-            surface.blit(range_surface, (mouse_pos[0] - range_val, mouse_pos[1] - range_val))
+            tower_type = self.game_controller.selected_tower_type
+            tower_img = preview_image(tower_type, can_place)
+            tower_rect = surface.blit(tower_img, tower_img.get_rect(center=mouse_pos))
+            range_val = TOWER_DATA[tower_type]["range"]
+            range_surface = range_overlay(range_val, fill_alpha=0, outline_alpha=100)
+            range_rect = surface.blit(range_surface, (mouse_pos[0] - range_val, mouse_pos[1] - range_val))
+            return [tower_rect, range_rect]
+        return []
     
-    def check_placement_legality(self, pos, new_tower_radius=25):
+    def check_placement_legality(self, pos, new_tower_radius=PLACEMENT_RADIUS):
         if not (new_tower_radius <= pos[0] <= GAME_AREA_WIDTH - new_tower_radius and \
                 new_tower_radius <= pos[1] <= SCREEN_HEIGHT - new_tower_radius): return False
         temp_rect = pygame.Rect(pos[0] - new_tower_radius, pos[1] - new_tower_radius, new_tower_radius * 2, new_tower_radius * 2)
-        if temp_rect.collidelist(self.path_rects) != -1: return False
-        for tower in self.towers:
-            if temp_rect.colliderect(tower.rect): return False
-        for decor in self.decorations:
-            if temp_rect.colliderect(decor.rect): return False
-        return True
+        return self.occupancy.is_free(temp_rect)
 
     def place_tower(self, pos):
-        if self.game_controller.selected_tower_type and self.check_placement_legality(pos):
-            tower_type = self.game_controller.selected_tower_type
-            cost = TOWER_DATA[tower_type]['cost']
-            if self.money >= cost:
-                new_tower = Tower(tower_type, pos); self.towers.add(new_tower)
-                self.money -= cost
-                if PLACE_TOWER_SOUND: PLACE_TOWER_SOUND.play()
+        if self.game_controller.selected_tower_type:
+            if self.build_tower(self.game_controller.selected_tower_type, pos):
                 self.game_controller.selected_tower_type = None
+
+    def build_tower(self, tower_type, pos):
+        if not self.check_placement_legality(pos): return None
+        cost = TOWER_DATA[tower_type]['cost']
+        if self.money < cost: return None
+        new_tower = Tower(tower_type, pos, self.sim_time); self.add_tower(new_tower)
+        if self.recorder: self.recorder.on_place(self.tick, tower_type, pos)
+        self.money -= cost
+        sounds.play(PLACE_TOWER_SOUND)
+        return new_tower
     
     def sell_tower(self, tower):
+        if self.recorder: self.recorder.on_sell(self.tick, tower)
+        self.towers_by_id.pop(tower.tower_id, None)
         self.money += tower.get_sell_price(); tower.kill()
+        self.occupancy.remove_rect(tower.rect)
+        self.invalidate_tower(tower)
 
     def upgrade_tower(self, tower, stat_name):
         cost = tower.get_upgrade_cost(stat_name)
         if self.money >= cost:
+            if self.recorder: self.recorder.on_upgrade(self.tick, tower, stat_name)
             self.money -= cost; tower.upgrade(stat_name)
-            if UPGRADE_SOUND: UPGRADE_SOUND.play()
\ No newline at end of file
+            sounds.play(UPGRADE_SOUND)
+            return True
+        return False
\ No newline at end of file
@@ -3,7 +3,7 @@ import os
 import settings  
 from game import Game
 
-pygame.init()
+settings.init_pygame()
 screen = pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
 pygame.display.set_caption("Защита королевства")
 settings.load_images()  
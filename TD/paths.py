@@ -0,0 +1,53 @@
+import math
+import bisect
+import numpy as np
+
+class CompiledPath:
+    def __init__(self, points):
+        self.points = [(float(x), float(y)) for x, y in points]
+        self.last_index = len(self.points) - 1
+        self.cumulative = [0.0]
+        self.directions = []
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:]):
+            dx, dy = x2 - x1, y2 - y1
+            length = math.sqrt(dx * dx + dy * dy)
+            self.directions.append((dx / length, dy / length) if length > 0 else (0.0, 0.0))
+            self.cumulative.append(self.cumulative[-1] + length)
+        self.total_length = self.cumulative[-1]
+
+        self.points_x = np.array([point[0] for point in self.points], dtype=np.float64)
+        self.points_y = np.array([point[1] for point in self.points], dtype=np.float64)
+        self.cumulative_array = np.array(self.cumulative, dtype=np.float64)
+        self.directions_x = np.array([d[0] for d in self.directions] or [0.0], dtype=np.float64)
+        self.directions_y = np.array([d[1] for d in self.directions] or [0.0], dtype=np.float64)
+
+    def segment_at(self, progress):
+        index = bisect.bisect_right(self.cumulative, progress) - 1
+        return min(max(index, 0), self.last_index)
+
+    def position_at(self, progress, segment=None):
+        if segment is None:
+            segment = self.segment_at(progress)
+        if segment >= self.last_index:
+            return self.points[self.last_index]
+        x, y = self.points[segment]
+        dx, dy = self.directions[segment]
+        offset = progress - self.cumulative[segment]
+        return (x + dx * offset, y + dy * offset)
+
+    def positions_at(self, progress, segments=None):
+        if segments is None:
+            segments = np.searchsorted(self.cumulative_array, progress, side="right") - 1
+        segments = np.clip(segments, 0, max(self.last_index - 1, 0))
+        offset = progress - self.cumulative_array[segments]
+        return (self.points_x[segments] + self.directions_x[segments] * offset,
+                self.points_y[segments] + self.directions_y[segments] * offset)
+
+_COMPILED_PATHS = {}
+
+def compile_path(points):
+    key = tuple(tuple(point) for point in points)
+    compiled = _COMPILED_PATHS.get(key)
+    if compiled is None:
+        compiled = _COMPILED_PATHS[key] = CompiledPath(key)
+    return compiled
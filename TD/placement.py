@@ -0,0 +1,65 @@
+import pygame
+import numpy as np
+
+class OccupancyGrid:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # Сколько препятствий покрывает каждый пиксель поля
+        self.counts = np.zeros((height, width), dtype=np.int32)
+        # Таблица сумм по префиксам: table[y, x] - сумма counts левее x и выше y; строится при первом запросе
+        self.table = None
+        self.heatmaps = {}
+
+    def add_rect(self, rect, delta=1):
+        left = max(0, rect.left); right = min(self.width, rect.right)
+        top = max(0, rect.top); bottom = min(self.height, rect.bottom)
+        if left >= right or top >= bottom:
+            return
+        self.counts[top:bottom, left:right] += delta
+        if self.table is not None:
+            # Вклад прямоугольника в префиксные суммы - произведение двух линейных рамп
+            rows = np.minimum(np.arange(1, self.height + 1 - top, dtype=np.int32), bottom - top)
+            columns = np.minimum(np.arange(1, self.width + 1 - left, dtype=np.int32), right - left)
+            self.table[top + 1:, left + 1:] += delta * rows[:, None] * columns
+        self.heatmaps.clear()
+
+    def remove_rect(self, rect):
+        self.add_rect(rect, -1)
+
+    def _summed_area(self):
+        # Загрузка уровня добавляет много прямоугольников подряд - дешевле один раз просуммировать
+        if self.table is None:
+            table = np.zeros((self.height + 1, self.width + 1), dtype=np.int32)
+            table[1:, 1:] = np.cumsum(np.cumsum(self.counts, axis=0), axis=1)
+            self.table = table
+        return self.table
+
+    def is_free(self, rect):
+        # Прямоугольник целиком внутри поля: пересечение с препятствиями как у colliderect
+        table = self._summed_area()
+        top, left, bottom, right = rect.top, rect.left, rect.bottom, rect.right
+        return table[bottom, right] - table[top, right] - table[bottom, left] + table[top, left] == 0
+
+    def legal_centers(self, radius):
+        # Маска центров, где квадрат 2*radius помещается на поле и ничего не задевает
+        table = self._summed_area()
+        size = radius * 2
+        free = (table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]) == 0
+        mask = np.zeros((self.height, self.width), dtype=np.bool_)
+        mask[radius:radius + free.shape[0], radius:radius + free.shape[1]] = free
+        return mask
+
+    def heatmap(self, radius, legal_color=(0, 255, 0, 45), illegal_color=(255, 0, 0, 60)):
+        surface = self.heatmaps.get(radius)
+        if surface is None:
+            legal = np.frombuffer(bytes(legal_color), dtype=np.uint32)[0]
+            illegal = np.frombuffer(bytes(illegal_color), dtype=np.uint32)[0]
+            pixels = np.where(self.legal_centers(radius), legal, illegal)
+            surface = pygame.image.frombytes(pixels.tobytes(), (self.width, self.height), "RGBA")
+            try:
+                surface = surface.convert_alpha()
+            except pygame.error:
+                pass
+            self.heatmaps[radius] = surface
+        return surface
@@ -0,0 +1,76 @@
+class EntityPool:
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args)
+            self.reused += 1
+        else:
+            entity = self.factory(*args)
+            self.created += 1
+        return entity
+
+    def release(self, entity):
+        self.free.append(entity)
+
+class EntityGroup:
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.entities = []
+        self.dead = 0
+
+    def spawn(self, *args):
+        entity = self.pool.acquire(*args)
+        self.add(entity)
+        return entity
+
+    def add(self, entity):
+        entity.group = self
+        entity.active = True
+        self.entities.append(entity)
+
+    def discard(self, entity):
+        # Удаление только помечает сущность, список сжимается в compact()
+        if entity.active and entity.group is self:
+            entity.active = False
+            self.dead += 1
+
+    def compact(self):
+        if not self.dead:
+            return
+        entities = self.entities
+        live = 0
+        for entity in entities:
+            if entity.active:
+                entities[live] = entity
+                live += 1
+            else:
+                entity.group = None
+                if self.pool is not None:
+                    self.pool.release(entity)
+        del entities[live:]
+        self.dead = 0
+
+    def update(self, *args):
+        # Добавленные во время обхода сущности обновятся со следующего тика
+        entities = self.entities
+        for index in range(len(entities)):
+            entity = entities[index]
+            if entity.active:
+                entity.update(*args)
+
+    def __iter__(self):
+        if self.dead:
+            return (entity for entity in self.entities if entity.active)
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities) - self.dead
+
+    def __bool__(self):
+        return len(self.entities) > self.dead
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import contextlib
+from collections import deque
+import pygame
+from settings import PROFILER_HISTORY_FRAMES
+
+NULL_SECTION = contextlib.nullcontext()
+
+class _Section:
+    __slots__ = ("profiler", "name", "start", "path")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        profiler.stack.append(self.name)
+        self.path = "/".join(profiler.stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        profiler = self.profiler
+        profiler.stack.pop()
+        profiler.sections.append((self.path, self.start, end - self.start))
+        return False
+
+class FrameProfiler:
+    def __init__(self, history=600):
+        self.enabled = False
+        self.active = False
+        self.frames = deque(maxlen=history)
+        self.sections = []
+        self.stack = []
+        self.frame_index = 0
+        self.frame_start = 0.0
+        self.origin = time.perf_counter()
+        self.font = None
+        self.overlay_rect = pygame.Rect(0, 0, 320, 0)
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if not self.enabled:
+            self.active = False
+            self.sections = []; self.stack = []
+
+    def section(self, name):
+        # Выключенный профайлер отдаёт общий пустой контекст
+        if not self.active:
+            return NULL_SECTION
+        return _Section(self, name)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.active = True
+        self.sections = []; self.stack = []
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.active:
+            return
+        self.active = False
+        duration = time.perf_counter() - self.frame_start
+        self.frames.append((self.frame_index, self.frame_start, duration, self.sections))
+        self.frame_index += 1
+        self.sections = []
+
+    def breakdown(self, frames=60):
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return 0.0, []
+        totals = {}
+        for _, _, _, sections in recent:
+            # Секции пишутся при выходе, порядок вызова восстанавливается по началу
+            for path, _, duration in sorted(sections, key=lambda section: section[1]):
+                totals[path] = totals.get(path, 0.0) + duration
+        frame_mean = sum(frame[2] for frame in recent) / len(recent) * 1000
+        return frame_mean, [(path.rsplit("/", 1)[-1], path.count("/"), total / len(recent) * 1000) for path, total in totals.items()]
+
+    def export_chrome_trace(self, path):
+        events = []
+        for index, start, duration, sections in self.frames:
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": round((start - self.origin) * 1e6, 3), "dur": round(duration * 1e6, 3),
+                           "args": {"frame": index}})
+            for section_path, section_start, section_duration in sections:
+                events.append({"name": section_path.rsplit("/", 1)[-1], "cat": section_path.split("/", 1)[0], "ph": "X", "pid": 1, "tid": 1,
+                               "ts": round((section_start - self.origin) * 1e6, 3), "dur": round(section_duration * 1e6, 3)})
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def draw_overlay(self, surface, topright, frame_budget_ms):
+        if self.font is None:
+            self.font = pygame.font.SysFont("consolas,dejavusansmono,couriernew", 14)
+        frame_mean, stages = self.breakdown()
+        graph_height = 80; line_height = 16
+        rect = self.overlay_rect
+        rect.height = 10 + graph_height + 10 + line_height * (len(stages) + 1) + 10
+        rect.topright = topright
+
+        panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+        panel.fill((20, 20, 28, 210))
+        graph = pygame.Rect(10, 10, rect.width - 20, graph_height)
+        pygame.draw.rect(panel, (60, 60, 70), graph, 1)
+        scale = graph_height / (frame_budget_ms * 3)
+        budget_y = graph.bottom - int(frame_budget_ms * scale)
+        pygame.draw.line(panel, (90, 160, 90), (graph.left, budget_y), (graph.right - 1, budget_y))
+        recent = list(self.frames)[-(graph.width - 2):]
+        for offset, (_, _, duration, _) in enumerate(recent):
+            ms = duration * 1000
+            color = (80, 200, 80) if ms <= frame_budget_ms else (230, 200, 60) if ms <= frame_budget_ms * 2 else (230, 70, 60)
+            height = min(graph_height - 2, max(1, int(ms * scale)))
+            x = graph.right - 1 - len(recent) + offset
+            pygame.draw.line(panel, color, (x, graph.bottom - 2), (x, graph.bottom - 1 - height))
+
+        y = graph.bottom + 10
+        lines = [(f"кадр  {frame_mean:6.2f} мс  ({len(self.frames)} в буфере)", 0)]
+        lines += [(f"{name:<14}{ms:6.2f} мс", depth) for name, depth, ms in stages]
+        for text, depth in lines:
+            panel.blit(self.font.render(text, True, (230, 230, 230)), (10 + depth * 12, y))
+            y += line_height
+        return surface.blit(panel, rect)
+
+profiler = FrameProfiler(PROFILER_HISTORY_FRAMES)
@@ -0,0 +1,168 @@
+import numpy as np
+from settings import PROJECTILE_DATA, PROJECTILE_ROTATION_STEPS, build_rotations
+
+PROJECTILE_FIELDS = (
+    ("x", np.float64), ("y", np.float64), ("prev_x", np.float64), ("prev_y", np.float64),
+    ("speed", np.float64), ("damage", np.int64), ("slow_factor", np.float64), ("slow_duration", np.float64),
+    ("has_slow", np.bool_), ("target_slot", np.int64), ("kind", np.int64), ("step", np.int64),
+    ("width", np.int64), ("height", np.int64),
+)
+
+def rect_origin(center, size):
+    # Как pygame.Rect.center: половинки округляются от нуля (2.5 -> 3, -2.5 -> -3)
+    whole = np.trunc(center)
+    rounded = np.where(np.abs(center - whole) == 0.5, whole + np.sign(center), np.rint(center))
+    return rounded.astype(np.int64) - size // 2
+
+class ProjectileEngine:
+    def __init__(self, enemy_engine, capacity=256):
+        self.enemy_engine = enemy_engine
+        enemy_engine.slot_listeners.append(self.retarget)
+        self.count = 0
+        self.kinds = {}
+        # Для каждого типа: спрайты по шагам поворота, последний - исходный без поворота
+        self.images = []
+        self.sizes = np.zeros((0, PROJECTILE_ROTATION_STEPS + 1, 2), dtype=np.int64)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        for name, dtype in PROJECTILE_FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            if self.count:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def _kind(self, proj_type):
+        kind = self.kinds.get(proj_type)
+        if kind is None:
+            data = PROJECTILE_DATA[proj_type]
+            if data.get("rotations") is None:
+                data["rotations"] = build_rotations(data["image"])
+            images = [image for image, _ in data["rotations"]] + [data["image"]]
+            kind = self.kinds[proj_type] = len(self.images)
+            self.images.append(images)
+            self.sizes = np.concatenate((self.sizes, [[image.get_size() for image in images]]))
+        return kind
+
+    def spawn(self, start_pos, target, damage, proj_type, slow_effect):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        kind = self._kind(proj_type)
+        self.x[i] = self.prev_x[i] = start_pos[0]
+        self.y[i] = self.prev_y[i] = start_pos[1]
+        self.speed[i] = PROJECTILE_DATA[proj_type]["speed"]
+        self.damage[i] = damage
+        self.has_slow[i] = bool(slow_effect)
+        self.slow_factor[i], self.slow_duration[i] = slow_effect or (0, 0)
+        # Снаряд по уже убитой цели снимается на следующем тике
+        self.target_slot[i] = target.slot if target.active and target.slot is not None else -1
+        self.kind[i] = kind
+        self.step[i] = PROJECTILE_ROTATION_STEPS
+        self.width[i], self.height[i] = self.sizes[kind, PROJECTILE_ROTATION_STEPS]
+        self.count += 1
+
+    def retarget(self, removed, moved_from):
+        # Движок врагов перенёс последний слот на место удалённого
+        slots = self.target_slot[:self.count]
+        orphaned = slots == removed
+        slots[slots == moved_from] = removed
+        slots[orphaned] = -1
+
+    def update(self):
+        if not self.count:
+            return
+        gone = self.target_slot[:self.count] < 0
+        if gone.any():
+            self._keep(~gone)
+        n = self.count
+        if not n:
+            return
+        enemies = self.enemy_engine
+        slots = self.target_slot[:n]
+        target_x = enemies.x[slots]; target_y = enemies.y[slots]
+        x = self.x[:n]; y = self.y[:n]
+
+        dx = target_x - x; dy = target_y - y
+        length = np.sqrt(dx * dx + dy * dy)
+        moving = length > 0
+        if not moving.all():
+            dx[~moving] = 0.0; dy[~moving] = 0.0; length[~moving] = 1.0
+        dx /= length; dy /= length
+        if moving.any():
+            angle = np.degrees(np.arctan2(-dy[moving], dx[moving]))
+            step = np.round(angle * PROJECTILE_ROTATION_STEPS / 360).astype(np.int64) % PROJECTILE_ROTATION_STEPS
+            self.step[:n][moving] = step
+            sizes = self.sizes[self.kind[:n][moving], step]
+            self.width[:n][moving] = sizes[:, 0]; self.height[:n][moving] = sizes[:, 1]
+
+        self.prev_x[:n] = x; self.prev_y[:n] = y
+        speed = self.speed[:n]
+        x += dx * speed; y += dy * speed
+
+        width = self.width[:n]; height = self.height[:n]
+        left = rect_origin(x, width); top = rect_origin(y, height)
+        target_width = enemies.width[slots]; target_height = enemies.height[slots]
+        target_left = rect_origin(target_x, target_width); target_top = rect_origin(target_y, target_height)
+        hits = np.flatnonzero((left < target_left + target_width) & (left + width > target_left) &
+                              (top < target_top + target_height) & (top + height > target_top))
+        if hits.size:
+            self._apply_hits(hits, n)
+
+    def _apply_hits(self, hits, n):
+        # Попадания применяются в порядке выстрелов, как при поштучном обновлении
+        enemy_list = self.enemy_engine.enemies
+        target_slot = self.target_slot
+        keep = np.ones(n, dtype=np.bool_)
+        payload = zip(hits.tolist(), self.damage[hits].tolist(), self.has_slow[hits].tolist(),
+                      self.slow_factor[hits].tolist(), self.slow_duration[hits].tolist())
+        for i, damage, has_slow, factor, duration in payload:
+            keep[i] = False
+            slot = target_slot[i]
+            if slot < 0:
+                continue
+            target = enemy_list[slot]
+            target.take_damage(damage)
+            if target.active:
+                if has_slow:
+                    target.apply_slow(factor, duration)
+            else:
+                # Снаряды, летевшие в ту же цель позже по очереди, исчезают в этом же тике
+                keep[i + 1:n] &= target_slot[i + 1:n] >= 0
+        self._keep(keep)
+
+    def _keep(self, keep):
+        n = self.count
+        kept = int(np.count_nonzero(keep))
+        if kept == n:
+            return
+        for name, _ in PROJECTILE_FIELDS:
+            array = getattr(self, name)
+            array[:kept] = array[:n][keep]
+        self.count = kept
+
+    def compact(self):
+        pass
+
+    def positions(self):
+        return zip(self.x[:self.count].tolist(), self.y[:self.count].tolist())
+
+    def draw(self, surface, alpha=1.0):
+        n = self.count
+        if not n:
+            return []
+        center_x = self.prev_x[:n] * (1 - alpha) + self.x[:n] * alpha
+        center_y = self.prev_y[:n] * (1 - alpha) + self.y[:n] * alpha
+        images = self.images; blit = surface.blit
+        rects = []
+        for kind, step, x, y in zip(self.kind[:n].tolist(), self.step[:n].tolist(), center_x.tolist(), center_y.tolist()):
+            image = images[kind][step]
+            rects.append(blit(image, image.get_rect(center=(x, y))))
+        return rects
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
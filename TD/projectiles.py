@@ -1,46 +1,81 @@
 # projectiles.py
 import pygame
 import math
-from settings import PROJECTILE_DATA
+from settings import PROJECTILE_DATA, PROJECTILE_ROTATION_STEPS, build_rotations
+
+class Projectile:
+    __slots__ = ("pos", "prev_pos", "target", "target_generation", "damage", "slow_effect", "speed", "proj_type",
+                 "original_image", "image", "rotations", "rect", "active", "group")
 
-class Projectile(pygame.sprite.Sprite):
     def __init__(self, start_pos, target, damage, proj_type, slow_effect):
-        super().__init__()
-        self.pos = pygame.math.Vector2(start_pos)
+        self.active = False
+        self.group = None
+        self.pos = pygame.math.Vector2()
+        self.prev_pos = pygame.math.Vector2()
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(start_pos, target, damage, proj_type, slow_effect)
+
+    def reset(self, start_pos, target, damage, proj_type, slow_effect):
+        self.pos.update(start_pos)
+        self.prev_pos.update(start_pos)
         self.target = target
+        self.target_generation = target.generation
         self.damage = damage
         self.slow_effect = slow_effect
+        self.proj_type = proj_type
         
         data = PROJECTILE_DATA[proj_type]
         self.speed = data["speed"]
         self.original_image = data["image"]
         self.image = self.original_image
-        self.rect = self.image.get_rect(center=self.pos)
+        if data.get("rotations") is None:
+            data["rotations"] = build_rotations(self.original_image)
+        self.rotations = data["rotations"]
+        self.rect.size = self.image.get_size()
+        self.rect.center = self.pos
+
+    def alive(self):
+        return self.active
+
+    def kill(self):
+        if self.group is not None:
+            self.group.discard(self)
 
-   
     def update(self):
-        if self.target and self.target.alive():
-            try:
-                direction = (self.target.pos - self.pos).normalize()
-            except ValueError:
-                direction = pygame.math.Vector2(0, 0)
-
-            self.rotate(direction)
-            self.pos += direction * self.speed
-            self.rect.center = self.pos
-        else:
+        target = self.target
+        # Цель могла умереть и вернуться из пула уже другим врагом
+        if not target.active or target.generation != self.target_generation:
             self.kill()
             return
-            
-        if self.rect.colliderect(self.target.rect):
-            self.target.take_damage(self.damage)
-            if self.slow_effect:
+        pos = self.pos
+        target_x, target_y = target.pos
+        dx = target_x - pos.x; dy = target_y - pos.y
+        length = math.sqrt(dx * dx + dy * dy)
+        if length > 0:
+            dx /= length; dy /= length
+            self.rotate(dx, dy)
+        else:
+            dx = dy = 0.0
+        self.prev_pos.update(pos)
+        pos.update(pos.x + dx * self.speed, pos.y + dy * self.speed)
+        self.rect.center = pos
+
+        if self.rect.colliderect(target.rect):
+            target.take_damage(self.damage)
+            # Замедление имеет смысл только для выжившей цели
+            if self.slow_effect and target.active:
                 factor, duration = self.slow_effect
-                self.target.apply_slow(factor, duration)
+                target.apply_slow(factor, duration)
             self.kill()
-    
-    def rotate(self, direction):
-        if direction.length() > 0:
-            angle = math.degrees(math.atan2(-direction.y, direction.x))
-            self.image = pygame.transform.rotate(self.original_image, angle)
-            self.rect = self.image.get_rect(center=self.rect.center)
\ No newline at end of file
+
+    def draw(self, surface, alpha=1.0):
+        rect = self.image.get_rect(center=self.prev_pos.lerp(self.pos, alpha))
+        return surface.blit(self.image, rect)
+
+    def rotate(self, dx, dy):
+        angle = math.degrees(math.atan2(-dy, dx))
+        step = round(angle * PROJECTILE_ROTATION_STEPS / 360) % PROJECTILE_ROTATION_STEPS
+        self.image, (half_width, half_height) = self.rotations[step]
+        rect = self.rect
+        center_x, center_y = rect.center
+        rect.update(center_x - half_width, center_y - half_height, *self.image.get_size())
\ No newline at end of file
@@ -0,0 +1,37 @@
+import pygame
+
+class DirtyRectRenderer:
+    def __init__(self, screen, enabled=True, max_dirty_ratio=0.4):
+        self.screen = screen
+        self.enabled = enabled
+        self.screen_rect = screen.get_rect()
+        self.max_dirty_area = int(self.screen_rect.width * self.screen_rect.height * max_dirty_ratio)
+        self.frame_key = None
+        self.full_redraw = True
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def begin_frame(self, frame_key):
+        # Любая смена экрана/уровня требует полной перерисовки
+        if frame_key != self.frame_key:
+            self.frame_key = frame_key
+            self.full_redraw = True
+        return self.enabled and not self.full_redraw
+
+    def present(self, rects=None):
+        if rects is None or not self.enabled or self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+            return
+        dirty = []
+        dirty_area = 0
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if rect.width and rect.height:
+                dirty.append(rect)
+                dirty_area += rect.width * rect.height
+        if dirty_area > self.max_dirty_area:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
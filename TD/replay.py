@@ -0,0 +1,228 @@
+import os
+import sys
+# Баннер pygame и выбор драйверов - до первого импорта pygame, иначе stdout --headless не JSON
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import json
+import time
+import zlib
+import struct
+import cProfile
+import pstats
+import argparse
+import pygame
+import settings
+from settings import TOWER_DATA
+
+# Файл: заголовок, затем записи фиксированного размера - обрыв на середине теряет только хвост
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<IBBdd")
+MAGIC = b"TDRP"
+VERSION = 1
+
+ACTION_PLACE = 1; ACTION_UPGRADE = 2; ACTION_SELL = 3; ACTION_WAVE = 4; ACTION_END = 5
+TOWER_TYPES = list(TOWER_DATA.keys())
+UPGRADE_STATS = ["damage", "fire_rate", "range"]
+
+def waves_checksum(waves):
+    return zlib.crc32(json.dumps(waves, sort_keys=True).encode("utf-8"))
+
+class ReplayRecorder:
+    def __init__(self, path, level_num, waves):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, level_num, waves_checksum(waves)))
+        self.file.flush()
+
+    def _write(self, tick, action, arg=0, a=0.0, b=0.0):
+        if self.file is None:
+            return
+        # Действий мало, а файл нужен и после падения игры - пишем сразу
+        self.file.write(RECORD.pack(tick, action, arg, a, b))
+        self.file.flush()
+
+    def on_place(self, tick, tower_type, pos):
+        self._write(tick, ACTION_PLACE, TOWER_TYPES.index(tower_type), pos[0], pos[1])
+
+    def on_upgrade(self, tick, tower, stat_name):
+        self._write(tick, ACTION_UPGRADE, UPGRADE_STATS.index(stat_name), tower.tower_id)
+
+    def on_sell(self, tick, tower):
+        self._write(tick, ACTION_SELL, 0, tower.tower_id)
+
+    def on_wave(self, tick):
+        self._write(tick, ACTION_WAVE)
+
+    def close(self, tick):
+        if self.file is None:
+            return
+        self._write(tick, ACTION_END)
+        self.file.close()
+        self.file = None
+
+class Replay:
+    def __init__(self, level_num, checksum, actions, end_tick=None):
+        self.level_num = level_num
+        self.checksum = checksum
+        self.actions = actions
+        self.end_tick = end_tick
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: файл повтора обрезан")
+    magic, version, level_num, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: неизвестный формат повтора")
+    actions = []; end_tick = None
+    usable = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size
+    for tick, action, arg, a, b in RECORD.iter_unpack(data[HEADER.size:usable]):
+        if action == ACTION_END:
+            end_tick = tick
+            break
+        actions.append((tick, action, arg, a, b))
+    return Replay(level_num, checksum, actions, end_tick)
+
+class ReplayPlayer:
+    def __init__(self, replay):
+        self.replay = replay
+        self.cursor = 0
+        self.diverged = []
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.replay.actions)
+
+    def apply(self, level):
+        # Вызывается в начале тика: действия записаны с номером тика, перед которым их сделал игрок
+        actions = self.replay.actions
+        while self.cursor < len(actions) and actions[self.cursor][0] <= level.tick:
+            tick, action, arg, a, b = actions[self.cursor]
+            self.cursor += 1
+            if action == ACTION_PLACE:
+                done = level.build_tower(TOWER_TYPES[arg], (a, b)) is not None
+            elif action == ACTION_WAVE:
+                done = level.trigger_next_wave()
+            else:
+                tower = level.towers_by_id.get(int(a))
+                if tower is None:
+                    done = False
+                elif action == ACTION_UPGRADE:
+                    done = level.upgrade_tower(tower, UPGRADE_STATS[arg])
+                else:
+                    level.sell_tower(tower); done = True
+            if not done:
+                self.diverged.append(tick)
+
+def replay_path(level_num):
+    base = os.path.join(settings.REPLAY_DIR, f"level{level_num}_{time.strftime('%Y%m%d_%H%M%S')}")
+    path = base + ".tdr"; suffix = 1
+    while os.path.exists(path):
+        path = f"{base}_{suffix}.tdr"; suffix += 1
+    return path
+
+def prune_replays(keep):
+    # Старшинство по времени изменения: в имени сначала идёт номер уровня
+    try:
+        paths = [os.path.join(settings.REPLAY_DIR, name) for name in os.listdir(settings.REPLAY_DIR) if name.endswith(".tdr")]
+        paths.sort(key=lambda path: (os.path.getmtime(path), path))
+    except OSError:
+        return
+    for path in paths[:-keep] if keep else []:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def play_headless(replay, max_ticks=None, slowest=10, profile_range=None):
+    from level import GameLevel
+    from headless import HeadlessController
+    controller = HeadlessController()
+    level = GameLevel(replay.level_num, controller, headless=True)
+    player = level.replay = ReplayPlayer(replay)
+    end_tick = replay.end_tick if max_ticks is None else max_ticks
+    profile = cProfile.Profile() if profile_range else None
+    tick_times = []
+
+    started = time.perf_counter()
+    while controller.state == "in_game":
+        if end_tick is not None and level.tick >= end_tick:
+            break
+        # Без метки конца повтор идёт, пока игроку ещё было что делать
+        if end_tick is None and player.finished and level.state == "between_waves":
+            break
+        profiling = profile is not None and profile_range[0] <= level.tick <= profile_range[1]
+        tick_started = time.perf_counter()
+        if profiling: profile.enable()
+        level.update()
+        if profiling: profile.disable()
+        tick_times.append(time.perf_counter() - tick_started)
+    elapsed = time.perf_counter() - started
+
+    worst = sorted(range(len(tick_times)), key=tick_times.__getitem__, reverse=True)[:slowest]
+    summary = {
+        "level": replay.level_num,
+        "result": controller.state if controller.state != "in_game" else "stopped",
+        "ticks": level.tick,
+        "waves_started": level.wave_index,
+        "lives_left": level.health,
+        "money": level.money,
+        "enemies_killed": level.enemies_killed,
+        "diverged_actions": player.diverged,
+        "checksum_ok": waves_checksum(level.waves) == replay.checksum,
+        "wall_seconds": round(elapsed, 3),
+        "ticks_per_second": round(level.tick / elapsed, 1) if elapsed > 0 else None,
+        "slowest_ticks": [{"tick": tick, "ms": round(tick_times[tick] * 1000, 3)} for tick in worst],
+    }
+    return summary, profile
+
+def play_windowed(replay, speed):
+    from game import Game
+    settings.init_pygame()
+    screen = pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
+    pygame.display.set_caption(f"Защита королевства - повтор x{speed:g}")
+    settings.load_images()
+    settings.update_unit_data()
+    game = Game(screen, pygame.time.Clock())
+    game.start_replay(replay, speed)
+    game.run()
+    pygame.quit()
+
+def parse_range(text):
+    first, _, last = text.partition(":")
+    return int(first), int(last or first)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизведение записанной партии")
+    parser.add_argument("replay", help="файл .tdr")
+    parser.add_argument("--speed", type=float, default=1.0, help="множитель скорости в окне")
+    parser.add_argument("--headless", action="store_true", help="без окна, на полной скорости")
+    parser.add_argument("--max-ticks", type=int, help="остановиться на этом тике")
+    parser.add_argument("--slowest", type=int, default=10, help="сколько самых долгих тиков показать")
+    parser.add_argument("--profile", metavar="TICK[:TICK]", help="cProfile для диапазона тиков (headless)")
+    parser.add_argument("--enemy-engine", action="store_true", help="векторный движок врагов")
+    parser.add_argument("--projectile-engine", action="store_true", help="векторный движок снарядов (включает движок врагов)")
+    args = parser.parse_args(argv)
+
+    replay = load_replay(args.replay)
+    if args.enemy_engine: settings.USE_ENEMY_ENGINE = True
+    if args.projectile_engine: settings.USE_PROJECTILE_ENGINE = True
+    if not args.headless:
+        play_windowed(replay, args.speed)
+        return
+
+    import headless
+    headless.setup_headless()
+    summary, profile = play_headless(replay, args.max_ticks, args.slowest, parse_range(args.profile) if args.profile else None)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if profile is not None:
+        pstats.Stats(profile, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+
+if __name__ == "__main__":
+    main()
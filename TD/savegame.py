@@ -0,0 +1,229 @@
+import os
+import json
+import zlib
+import struct
+import threading
+import pygame
+from settings import ENEMY_DATA, TOWER_DATA, PROJECTILE_DATA, PROJECTILE_ROTATION_STEPS, SIM_TICK_MS, LEVELS_CONFIG
+
+# Снимок уровня: заголовок, общие поля, затем массивы записей фиксированного размера.
+# В заголовке crc32 всего остального: испорченные числа иначе всплыли бы посреди уровня
+HEADER = struct.Struct("<4sHHII")
+LEVEL = struct.Struct("<IqqqiiBIIIIII")
+TOWER = struct.Struct("<IBddBBBqqqqd")
+ENEMY = struct.Struct("<Bidddddqqddd")
+PROJECTILE = struct.Struct("<Biqddddh?dd")
+MAGIC = b"TDSV"
+VERSION = 2
+
+ENEMY_TYPES = list(ENEMY_DATA.keys())
+TOWER_TYPES = list(TOWER_DATA.keys())
+PROJECTILE_TYPES = list(PROJECTILE_DATA.keys())
+UPGRADE_STATS = ("damage", "fire_rate", "range")
+LEVEL_STATES = ("between_waves", "wave_in_progress")
+
+def waves_checksum(waves):
+    return zlib.crc32(json.dumps(waves, sort_keys=True).encode("utf-8"))
+
+def _projectile_records(level, enemy_index):
+    # Снаряды по уже мёртвой цели в следующем тике исчезнут и так, их не сохраняем
+    engine = level.projectile_engine
+    if engine is not None:
+        enemies = level.enemy_engine.enemies
+        kinds = {kind: PROJECTILE_TYPES.index(proj_type) for proj_type, kind in engine.kinds.items()}
+        for i in range(engine.count):
+            slot = int(engine.target_slot[i])
+            if slot < 0:
+                continue
+            step = int(engine.step[i])
+            yield (kinds[int(engine.kind[i])], enemy_index[enemies[slot]], int(engine.damage[i]),
+                   float(engine.x[i]), float(engine.y[i]), float(engine.prev_x[i]), float(engine.prev_y[i]),
+                   -1 if step == PROJECTILE_ROTATION_STEPS else step,
+                   bool(engine.has_slow[i]), float(engine.slow_factor[i]), float(engine.slow_duration[i]))
+        return
+    for projectile in level.projectiles:
+        target = projectile.target
+        if not target.active or target.generation != projectile.target_generation:
+            continue
+        step = next((index for index, (image, _) in enumerate(projectile.rotations) if image is projectile.image), -1)
+        factor, duration = projectile.slow_effect or (0, 0)
+        yield (PROJECTILE_TYPES.index(projectile.proj_type), enemy_index[target], projectile.damage,
+               projectile.pos.x, projectile.pos.y, projectile.prev_pos.x, projectile.prev_pos.y,
+               step, bool(projectile.slow_effect), factor, duration)
+
+def snapshot(level):
+    # Собирается в основном потоке за доли миллисекунды, на диск уходит уже готовый bytes
+    towers = list(level.towers)
+    enemies = list(level.enemies)
+    enemy_index = {enemy: index for index, enemy in enumerate(enemies)}
+    projectiles = list(_projectile_records(level, enemy_index))
+
+    parts = [LEVEL.pack(level.tick, level.health, level.start_health, level.money, level.wave_index, level.enemies_killed,
+                        LEVEL_STATES.index(level.state), level.spawn_cursor, level.wave_start_tick, level.next_tower_id,
+                        len(towers), len(enemies), len(projectiles))]
+    for tower in towers:
+        parts.append(TOWER.pack(tower.tower_id, TOWER_TYPES.index(tower.tower_type), tower.pos.x, tower.pos.y,
+                                *(tower.upgrade_levels[stat] for stat in UPGRADE_STATS),
+                                tower.damage, tower.fire_rate, tower.range, tower.total_cost, tower.last_shot_time))
+    for enemy in enemies:
+        pos = enemy.pos; prev_pos = enemy.prev_pos
+        parts.append(ENEMY.pack(ENEMY_TYPES.index(enemy.enemy_type), enemy.path_index, enemy.path_progress,
+                                pos.x, pos.y, prev_pos.x, prev_pos.y, enemy.health, enemy.max_health,
+                                enemy.speed, enemy.original_speed, enemy.slow_timer))
+    parts.extend(PROJECTILE.pack(*record) for record in projectiles)
+    payload = b"".join(parts)
+    return HEADER.pack(MAGIC, VERSION, level.level_num, waves_checksum(level.waves), zlib.crc32(payload)) + payload
+
+def _checked(index, limit, what):
+    # Испорченный номер упал бы не здесь, а посреди уровня
+    if not 0 <= index < limit:
+        raise ValueError(f"Повреждённое сохранение: {what} {index}")
+    return index
+
+def _unpack_array(record, data, offset, count):
+    end = offset + record.size * count
+    if end > len(data):
+        raise ValueError("Сохранение обрезано")
+    return list(record.iter_unpack(data[offset:end])), end
+
+def restore(data, game_controller, **level_options):
+    from level import GameLevel
+    from towers import Tower
+    if len(data) < HEADER.size + LEVEL.size:
+        raise ValueError("Сохранение обрезано")
+    magic, version, level_num, checksum, payload_checksum = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неизвестный формат сохранения")
+    if zlib.crc32(data[HEADER.size:]) != payload_checksum:
+        raise ValueError("Сохранение повреждено")
+    (tick, health, start_health, money, wave_index, enemies_killed, state, spawn_cursor, wave_start_tick,
+     next_tower_id, tower_count, enemy_count, projectile_count) = LEVEL.unpack_from(data, HEADER.size)
+    offset = HEADER.size + LEVEL.size
+    towers, offset = _unpack_array(TOWER, data, offset, tower_count)
+    enemies, offset = _unpack_array(ENEMY, data, offset, enemy_count)
+    projectiles, offset = _unpack_array(PROJECTILE, data, offset, projectile_count)
+
+    if level_num not in LEVELS_CONFIG:
+        raise ValueError(f"Уровня {level_num} больше нет")
+    level = GameLevel(level_num, game_controller, **level_options)
+    if waves_checksum(level.waves) != checksum:
+        raise ValueError("Волны уровня изменились после сохранения")
+    _checked(state, len(LEVEL_STATES), "состояние")
+    _checked(wave_index, len(level.waves) + 1, "волна")
+    level.tick = tick; level.sim_time = tick * SIM_TICK_MS
+    level.health = health; level.start_health = start_health; level.money = money
+    level.wave_index = wave_index; level.enemies_killed = enemies_killed
+    level.state = LEVEL_STATES[state]
+    if level.state == "wave_in_progress":
+        level.spawn_timeline = level.timelines[_checked(wave_index - 1, len(level.timelines), "волна")]
+    _checked(spawn_cursor, len(level.spawn_timeline) + 1, "позиция спавна")
+    level.spawn_cursor = spawn_cursor; level.wave_start_tick = wave_start_tick
+
+    for tower_id, tower_type, x, y, damage_level, fire_rate_level, range_level, damage, fire_rate, tower_range, total_cost, last_shot_time in towers:
+        tower = Tower(TOWER_TYPES[_checked(tower_type, len(TOWER_TYPES), "тип башни")], (x, y), last_shot_time)
+        tower.upgrade_levels = dict(zip(UPGRADE_STATS, (damage_level, fire_rate_level, range_level)))
+        tower.damage = damage; tower.fire_rate = fire_rate; tower.range = tower_range; tower.total_cost = total_cost
+        level.add_tower(tower)
+        # add_tower выдаёт новый номер, а записи повтора и улучшения ссылаются на старый
+        del level.towers_by_id[tower.tower_id]
+        tower.tower_id = tower_id; level.towers_by_id[tower_id] = tower
+    level.next_tower_id = next_tower_id
+
+    restored_enemies = []
+    for enemy_type, path_index, progress, x, y, prev_x, prev_y, enemy_health, max_health, speed, original_speed, slow_timer in enemies:
+        enemy = level.create_enemy(ENEMY_TYPES[_checked(enemy_type, len(ENEMY_TYPES), "тип врага")])
+        _checked(path_index, level.compiled_path.last_index + 1, "отрезок пути")
+        enemy.path_index = path_index; enemy.path_progress = progress
+        enemy.pos = pygame.math.Vector2(x, y); enemy.prev_pos = pygame.math.Vector2(prev_x, prev_y)
+        enemy.rect.center = enemy.pos
+        enemy.health = enemy_health; enemy.max_health = max_health
+        enemy.speed = speed; enemy.original_speed = original_speed; enemy.slow_timer = slow_timer
+        level.enemies.add(enemy)
+        restored_enemies.append(enemy)
+
+    engine = level.projectile_engine
+    for proj_type, target, damage, x, y, prev_x, prev_y, step, has_slow, factor, duration in projectiles:
+        proj_type = PROJECTILE_TYPES[_checked(proj_type, len(PROJECTILE_TYPES), "тип снаряда")]
+        _checked(target, len(restored_enemies), "цель снаряда")
+        if step >= 0: _checked(step, PROJECTILE_ROTATION_STEPS, "поворот снаряда")
+        slow_effect = (factor, duration) if has_slow else None
+        if engine is not None:
+            engine.spawn((x, y), restored_enemies[target], damage, proj_type, slow_effect)
+            i = engine.count - 1
+            engine.prev_x[i] = prev_x; engine.prev_y[i] = prev_y
+            if step >= 0:
+                engine.step[i] = step
+                engine.width[i], engine.height[i] = engine.sizes[engine.kind[i], step]
+            continue
+        projectile = level.projectiles.spawn((x, y), restored_enemies[target], damage, proj_type, slow_effect)
+        projectile.prev_pos.update(prev_x, prev_y)
+        if step >= 0:
+            projectile.image = projectile.rotations[step][0]
+            projectile.rect.size = projectile.image.get_size()
+            projectile.rect.center = projectile.pos
+    level.rebuild_enemy_grid()
+    return level
+
+def load(path, game_controller, **level_options):
+    with open(path, "rb") as f:
+        return restore(f.read(), game_controller, **level_options)
+
+class SaveWriter:
+    def __init__(self):
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.busy = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, path, data):
+        # Более новый снимок вытесняет ещё не записанный; None - удалить файл
+        with self.condition:
+            self.pending[path] = data
+            self.condition.notify()
+
+    def wait(self):
+        with self.condition:
+            while self.pending or self.busy:
+                self.condition.wait()
+
+    def close(self):
+        self.wait()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                path, data = self.pending.popitem()
+                self.busy = True
+            try:
+                if data is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    write_atomic(path, data)
+            except OSError as error:
+                print(f"Error: Failed to write save file: {error}")
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+def write_atomic(path, data):
+    # Сначала временный файл на диск, потом переименование: старое сохранение не теряется при сбое
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
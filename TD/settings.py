@@ -2,14 +2,31 @@ import pygame
 import numpy as np
 import math
 import os
-from scipy.io import wavfile
-
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()
+import wave
+import threading
+from assets import AssetCache
 
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 FPS = 60
+SIM_TICK_RATE = 60
+SIM_TICK_MS = 1000 / SIM_TICK_RATE
+MAX_SIM_TICKS_PER_FRAME = 5
+# Ускорение: несколько тиков за кадр, но не дольше бюджета, иначе падает частота кадров
+GAME_SPEEDS = (1, 2, 4, 8)
+SIM_FRAME_BUDGET_MS = 10
+WAVE_SPAWN_INTERVAL = 500
+
+CACHE_DIR = ".cache"
+PROFILE_DIR = "profiles"
+REPLAY_DIR = "replays"
+# Каждая партия пишется в REPLAY_DIR, хранятся последние REPLAY_KEEP файлов
+RECORD_REPLAYS = True
+REPLAY_KEEP = 20
+# Незавершённый уровень: сохраняется после каждой волны и при выходе, кнопка "Продолжить" в меню
+SAVE_PATH = "savegame.dat"
+PROFILER_HISTORY_FRAMES = 600
+DIRTY_RECT_RENDERING = True
 
 RIGHT_PANEL_WIDTH = 240
 GAME_AREA_WIDTH = SCREEN_WIDTH - RIGHT_PANEL_WIDTH
@@ -42,10 +59,79 @@ UPGRADE_LEVEL_COSTS = [0.8, 1.0, 1.2]
 UPGRADE_BONUS = 0.4
 SELL_RATIO = 0.7
 MAX_UPGRADE_LEVEL = 3
-
-FONT_MAIN = pygame.font.SysFont("arial", 40)
-FONT_SMALL = pygame.font.SysFont("arial", 28)
-FONT_TINY = pygame.font.SysFont("arial", 22)
+ENEMY_GRID_CELL_SIZE = 64
+USE_ENEMY_ENGINE = False
+# Снаряды в массивах NumPy; требует движка врагов и включает его
+USE_PROJECTILE_ENGINE = False
+PLACEMENT_RADIUS = 25
+PROJECTILE_ROTATION_STEPS = 64
+# Эффекты играют на своих каналах, не больше двух голосов одного звука за кадр
+SFX_CHANNELS = 8
+SFX_VOICES_PER_SOUND = 2
+# Громкость одного голоса: запас до 1.0 нужен, чтобы слитые копии звучали громче
+SFX_VOICE_VOLUME = 0.6
+
+class LazyFont:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._font = None
+
+    def get(self):
+        if self._font is None:
+            with _asset_lock:
+                if self._font is None:
+                    if not pygame.font.get_init():
+                        pygame.font.init()
+                    self._font = pygame.font.SysFont(self.name, self.size)
+        return self._font
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+class LazySound:
+    def __init__(self, frequency=440, duration=0.1, volume=0.1, decay=True):
+        self.params = (frequency, duration, volume, decay)
+        self._sound = None
+        self._ready = False
+        self._volume = None
+
+    def get(self):
+        if not self._ready:
+            with _asset_lock:
+                # Пока микшер не поднят, звук не синтезируется (например, в headless-режиме)
+                if not self._ready and pygame.mixer.get_init():
+                    self._sound = generate_sound(*self.params)
+                    if self._sound and self._volume is not None:
+                        self._sound.set_volume(self._volume)
+                    self._ready = True
+        return self._sound
+
+    def __bool__(self):
+        return self.get() is not None
+
+    def play(self, *args, **kwargs):
+        sound = self.get()
+        return sound.play(*args, **kwargs) if sound else None
+
+    def set_volume(self, value):
+        self._volume = value
+        if self._sound:
+            self._sound.set_volume(value)
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+_asset_lock = threading.RLock()
+_music_lock = threading.Lock()
+
+FONT_MAIN = LazyFont("arial", 40)
+FONT_SMALL = LazyFont("arial", 28)
+FONT_TINY = LazyFont("arial", 22)
+FONT_TITLE = LazyFont("arial", 60)
+FONT_BUTTON = LazyFont("arial", 30)
+TEXT_CACHE_SIZE = 256
+OVERLAY_CACHE_SIZE = 32
 
 def generate_sound(frequency=440, duration=0.1, volume=0.1, decay=True):
     try:
@@ -66,18 +152,24 @@ def generate_sound(frequency=440, duration=0.1, volume=0.1, decay=True):
     except (ImportError, pygame.error):
         return None
 
-SHOOT_SOUND = generate_sound(frequency=880, duration=0.05, volume=0.1)
-HIT_SOUND = generate_sound(frequency=220, duration=0.08, volume=0.2)
-PLACE_TOWER_SOUND = generate_sound(frequency=660, duration=0.1, volume=0.1)
-UPGRADE_SOUND = generate_sound(frequency=1200, duration=0.1, volume=0.15)
-SELL_SOUND = generate_sound(frequency=440, duration=0.15, volume=0.15, decay=False)
+SHOOT_SOUND = LazySound(frequency=880, duration=0.05, volume=0.1)
+HIT_SOUND = LazySound(frequency=220, duration=0.08, volume=0.2)
+PLACE_TOWER_SOUND = LazySound(frequency=660, duration=0.1, volume=0.1)
+UPGRADE_SOUND = LazySound(frequency=1200, duration=0.1, volume=0.15)
+SELL_SOUND = LazySound(frequency=440, duration=0.15, volume=0.15, decay=False)
 
 BACKGROUND_MUSIC = True
-try:
-    pygame.mixer.music.load("assets/sounds/background_music.mp3")
-except pygame.error:
-    try:
-        sample_rate = pygame.mixer.get_init()[0]
+MUSIC_LOADED = False
+MUSIC_PATH = "assets/sounds/background_music.mp3"
+
+def generated_music_path(sample_rate):
+    return os.path.join(CACHE_DIR, f"background_music_{sample_rate}.wav")
+
+def generate_music_file(sample_rate):
+    path = generated_music_path(sample_rate)
+    with _music_lock:
+        if os.path.exists(path):
+            return path
         duration = 60
         n_samples = int(round(duration * sample_rate))
         buf = np.zeros((n_samples, 2), dtype=np.int16)
@@ -90,27 +182,64 @@ except pygame.error:
         waveform *= decay_arr
         buf[:, 0] = (waveform * amplitude).astype(np.int16)
         buf[:, 1] = (waveform * amplitude).astype(np.int16)
-        temp_wav = "temp_background_music.wav"
-        wavfile.write(temp_wav, sample_rate, buf)
-        pygame.mixer.music.load(temp_wav)
-    except (ImportError, pygame.error, OSError):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_path = path + ".tmp"
+        with wave.open(temp_path, "wb") as f:
+            f.setnchannels(2); f.setsampwidth(2); f.setframerate(sample_rate)
+            f.writeframes(buf.tobytes())
+        os.replace(temp_path, path)
+    return path
+
+def load_music():
+    global BACKGROUND_MUSIC, MUSIC_LOADED
+    if MUSIC_LOADED or not BACKGROUND_MUSIC:
+        return BACKGROUND_MUSIC
+    if not pygame.mixer.get_init():
         BACKGROUND_MUSIC = False
-
-def load_images():
+        return False
+    try:
+        pygame.mixer.music.load(MUSIC_PATH)
+    except pygame.error:
+        try:
+            pygame.mixer.music.load(generate_music_file(pygame.mixer.get_init()[0]))
+        except (pygame.error, OSError):
+            BACKGROUND_MUSIC = False
+            return False
+    MUSIC_LOADED = True
+    return True
+
+def warm_up_assets():
+    for font in (FONT_MAIN, FONT_SMALL, FONT_TINY, FONT_TITLE, FONT_BUTTON):
+        font.get()
+    for sound in (SHOOT_SOUND, HIT_SOUND, PLACE_TOWER_SOUND, UPGRADE_SOUND, SELL_SOUND):
+        sound.get()
+    if pygame.mixer.get_init() and not os.path.exists(MUSIC_PATH):
+        try:
+            generate_music_file(pygame.mixer.get_init()[0])
+        except OSError:
+            pass
+
+def init_pygame(warm_up=True):
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.init()
+    # Шрифты, звуки и музыка готовятся в фоне, пока строится первый экран
+    if warm_up:
+        threading.Thread(target=warm_up_assets, name="asset-warmup", daemon=True).start()
+
+def load_images(headless=False):
     global ENEMY_IMAGES, TOWER_IMAGES, PROJECTILE_IMAGES, UI_IMAGES, LEVEL_IMAGES, ROAD_IMAGES, DECORATION_IMAGES
     placeholder_surface = pygame.Surface((10, 10), pygame.SRCALPHA)
     placeholder_surface.fill((255, 0, 0, 128))
 
+    jobs = []
+
     def load_image(paths, size):
-        for path in paths:
-            if os.path.exists(path):
-                try:
-                    image = pygame.image.load(path)
-                    image = image.convert_alpha()
-                    return pygame.transform.scale(image, size)
-                except pygame.error:
-                    pass
-        return placeholder_surface
+        # Без дисплея нужны только размеры спрайтов: хитбоксы зависят от них
+        if headless:
+            return pygame.Surface(size, pygame.SRCALPHA)
+        # Загрузка откладывается: все картинки читаются одним пакетом ниже
+        jobs.append((tuple(paths), tuple(size)))
+        return jobs[-1]
 
     ENEMY_IMAGES = {
         "goblin": load_image(["assets/images/enemies/goblin.png"], (25, 25)),
@@ -262,6 +391,15 @@ def load_images():
         "bridge_3_1": load_image(["assets/images/decorations/bridge_1_2.png"], (160, 110))
     }
 
+    if headless:
+        return
+    asset_cache = AssetCache(os.path.join(CACHE_DIR, "assets"))
+    loaded = asset_cache.load_all(jobs)
+    asset_cache.prune()
+    for images in (ENEMY_IMAGES, TOWER_IMAGES, PROJECTILE_IMAGES, UI_IMAGES, LEVEL_IMAGES, ROAD_IMAGES, DECORATION_IMAGES):
+        for name, job in images.items():
+            images[name] = loaded.get(job, placeholder_surface)
+
 ENEMY_IMAGES = {}
 TOWER_IMAGES = {}
 PROJECTILE_IMAGES = {}
@@ -298,6 +436,17 @@ def update_unit_data():
         TOWER_DATA[key]["image"] = TOWER_IMAGES.get(key, None)
     for key in PROJECTILE_DATA:
         PROJECTILE_DATA[key]["image"] = PROJECTILE_IMAGES.get(key, None)
+        PROJECTILE_DATA[key]["rotations"] = build_rotations(PROJECTILE_DATA[key]["image"])
+
+def build_rotations(image, steps=PROJECTILE_ROTATION_STEPS):
+    if image is None:
+        return None
+    rotations = []
+    for step in range(steps):
+        rotated = pygame.transform.rotate(image, step * 360 / steps)
+        width, height = rotated.get_size()
+        rotations.append((rotated, (width // 2, height // 2)))
+    return rotations
 
 LEVELS_CONFIG = {
     1: {
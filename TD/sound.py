@@ -0,0 +1,62 @@
+import math
+import pygame
+from settings import SFX_CHANNELS, SFX_VOICES_PER_SOUND, SFX_VOICE_VOLUME
+
+class SoundDispatcher:
+    def __init__(self, channels=SFX_CHANNELS, voices_per_sound=SFX_VOICES_PER_SOUND, voice_volume=SFX_VOICE_VOLUME):
+        self.channel_count = channels
+        self.voices_per_sound = voices_per_sound
+        self.voice_volume = voice_volume
+        self.pending = {}
+        self.channels = None
+        # Номер последнего запущенного голоса и номер голоса на каждом канале - для вытеснения самого старого
+        self.voice_sequence = 0
+        self.started = []
+
+    def play(self, sound):
+        # За тик только считаем запросы, микшер трогаем один раз в flush()
+        self.pending[sound] = self.pending.get(sound, 0) + 1
+
+    def _reserve_channels(self):
+        # Первые каналы микшера резервируются: Sound.play() их не займёт
+        if pygame.mixer.get_num_channels() < self.channel_count:
+            pygame.mixer.set_num_channels(self.channel_count)
+        pygame.mixer.set_reserved(self.channel_count)
+        self.channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+        self.started = [0] * self.channel_count
+
+    def _channel(self):
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        # Все заняты - вытесняем самый давно запущенный голос
+        return min(range(len(self.channels)), key=self.started.__getitem__)
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = {}
+        if not pygame.mixer.get_init():
+            return
+        if self.channels is None:
+            self._reserve_channels()
+        for lazy_sound, count in pending.items():
+            sound = lazy_sound.get()
+            if sound is None:
+                continue
+            voices = min(count, self.voices_per_sound)
+            # Совпавшие за кадр запросы сливаются в несколько голосов: громкость растёт как корень из числа копий
+            volume = min(1.0, self.voice_volume * math.sqrt(count / voices))
+            for _ in range(voices):
+                index = self._channel()
+                channel = self.channels[index]
+                channel.set_volume(volume)
+                channel.play(sound)
+                self.voice_sequence += 1
+                self.started[index] = self.voice_sequence
+
+    def clear(self):
+        self.pending = {}
+
+sounds = SoundDispatcher()
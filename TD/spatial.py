@@ -0,0 +1,44 @@
+class SpatialHash:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.order = {}
+
+    def rebuild(self, items):
+        # items - кортежи (entity, x, y, progress), они же и лежат в ячейках
+        cells = {}
+        order = {}
+        size = self.cell_size
+        for index, item in enumerate(items):
+            entity, x, y, _ = item
+            order[entity] = index
+            key = (int(x // size), int(y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [item]
+            else:
+                bucket.append(item)
+        self.cells = cells
+        self.order = order
+
+    def query_radius(self, pos, radius):
+        size = self.cell_size
+        x, y = pos
+        min_cx = int((x - radius) // size); max_cx = int((x + radius) // size)
+        min_cy = int((y - radius) // size); max_cy = int((y + radius) // size)
+        radius_sq = radius * radius
+        cells = self.cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for entity, entity_x, entity_y, progress in bucket:
+                        dx = entity_x - x; dy = entity_y - y
+                        if dx * dx + dy * dy <= radius_sq:
+                            yield entity, progress
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
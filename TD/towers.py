@@ -1,12 +1,44 @@
 import pygame
 import math
+from collections import OrderedDict
 from settings import *
-from projectiles import Projectile
+from sound import sounds
+
+_overlay_cache = OrderedDict()
+_preview_cache = {}
+
+def range_overlay(radius, color=WHITE, fill_alpha=70, outline_alpha=150):
+    # Круги дальности одного радиуса и цвета общие для всех башен
+    key = (radius, color, fill_alpha, outline_alpha)
+    overlay = _overlay_cache.get(key)
+    if overlay is not None:
+        _overlay_cache.move_to_end(key)
+        return overlay
+    overlay = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    if fill_alpha:
+        pygame.draw.circle(overlay, (*color, fill_alpha), (radius, radius), radius)
+    pygame.draw.circle(overlay, (*color, outline_alpha), (radius, radius), radius, 1)
+    _overlay_cache[key] = overlay
+    if len(_overlay_cache) > OVERLAY_CACHE_SIZE:
+        _overlay_cache.popitem(last=False)
+    return overlay
+
+def preview_image(tower_type, legal):
+    # Тонированный спрайт превью; пересоздаётся, если спрайты башен перезагрузили
+    source = TOWER_DATA[tower_type]["image"]
+    cached = _preview_cache.get((tower_type, legal))
+    if cached is not None and cached[0] is source:
+        return cached[1]
+    image = source.copy()
+    image.fill((0, 255, 0, 150) if legal else (255, 0, 0, 150), special_flags=pygame.BLEND_RGBA_MULT)
+    _preview_cache[(tower_type, legal)] = (source, image)
+    return image
 
 class Tower(pygame.sprite.Sprite):
-    def __init__(self, tower_type, pos):
+    def __init__(self, tower_type, pos, now=0):
         super().__init__()
         self.tower_type = tower_type
+        self.tower_id = None
         self.pos = pygame.math.Vector2(pos)
         
         base_data = TOWER_DATA[tower_type]
@@ -18,6 +50,7 @@ class Tower(pygame.sprite.Sprite):
         self.damage = self.base_damage
         self.fire_rate = self.base_fire_rate
         self.range = self.base_range
+        self.range_image = None
         
         self.projectile_type = base_data["projectile"]
         self.image = base_data["image"]
@@ -27,7 +60,7 @@ class Tower(pygame.sprite.Sprite):
         self.total_cost = self.base_cost
         
         self.rect = self.image.get_rect(center=self.pos)
-        self.last_shot_time = pygame.time.get_ticks()
+        self.last_shot_time = now
 
     def get_upgrade_cost(self, stat_name):
         level = self.upgrade_levels[stat_name]
@@ -47,31 +80,31 @@ class Tower(pygame.sprite.Sprite):
                 self.fire_rate = int(self.fire_rate * (1 - UPGRADE_BONUS))
             elif stat_name == "range":
                 self.range = int(self.range * (1 + UPGRADE_BONUS))
+                self.range_image = None
                 
             self.upgrade_levels[stat_name] += 1
     
     def get_sell_price(self):
         return int(self.total_cost * SELL_RATIO)
 
-    def update(self, enemies, projectiles_group):
-        self.shoot(enemies, projectiles_group)
+    def update(self, enemy_grid, projectiles_group, now):
+        self.shoot(enemy_grid, projectiles_group, now)
 
-    def shoot(self, enemies, projectiles_group):
-        current_time = pygame.time.get_ticks()
+    def shoot(self, enemy_grid, projectiles_group, current_time):
         if current_time - self.last_shot_time > self.fire_rate:
-            target = self.find_target(enemies)
+            target = self.find_target(enemy_grid)
             if target:
                 self.last_shot_time = current_time
-                projectile = Projectile(self.pos, target, self.damage, self.projectile_type, self.slow_effect)
-                projectiles_group.add(projectile)
-                if SHOOT_SOUND: SHOOT_SOUND.play()
+                projectiles_group.spawn(self.pos, target, self.damage, self.projectile_type, self.slow_effect)
+                sounds.play(SHOOT_SOUND)
     
-    def find_target(self, enemies):
-        best_target = None; max_progress = -1
-        for enemy in enemies:
-            dist = self.pos.distance_to(enemy.pos)
-            if dist <= self.range and enemy.path_progress > max_progress:
-                max_progress = enemy.path_progress; best_target = enemy
+    def find_target(self, enemy_grid):
+        # При равном прогрессе выигрывает враг, добавленный в группу раньше
+        best_target = None; max_progress = -1; best_order = 0
+        order = enemy_grid.order
+        for enemy, progress in enemy_grid.query_radius(self.pos, self.range):
+            if progress > max_progress or (progress == max_progress and order[enemy] < best_order):
+                max_progress = progress; best_target = enemy; best_order = order[enemy]
         return best_target
         
     def draw(self, surface):
@@ -85,7 +118,6 @@ class Tower(pygame.sprite.Sprite):
                 pygame.draw.rect(surface, color, (bar_x + j*11, bar_y, 8, 4))
     
     def draw_range(self, surface):
-        range_surface = pygame.Surface((self.range * 2, self.range * 2), pygame.SRCALPHA)
-        pygame.draw.circle(range_surface, (*WHITE, 70), (self.range, self.range), self.range)
-        pygame.draw.circle(range_surface, (*WHITE, 150), (self.range, self.range), self.range, 1)
-        surface.blit(range_surface, (self.pos.x - self.range, self.pos.y - self.range))
\ No newline at end of file
+        if self.range_image is None:
+            self.range_image = range_overlay(self.range)
+        return surface.blit(self.range_image, (self.pos.x - self.range, self.pos.y - self.range))
\ No newline at end of file
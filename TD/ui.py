@@ -1,17 +1,43 @@
 import pygame
-from settings import SLATE_GREY, BLUE, WHITE
+import settings
+from collections import OrderedDict
+from settings import SLATE_GREY, BLUE, WHITE, FONT_BUTTON, TEXT_CACHE_SIZE
+
+_text_cache = OrderedDict()
+
+def render_text(font, text, color=WHITE, antialias=True):
+    # Общий LRU-кэш отрисованного текста: одинаковые строки не рендерятся повторно
+    key = (font, text, color, antialias)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+    surface = _text_cache[key] = font.render(text, antialias, color)
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
 
 class Button:
     def __init__(self, x, y, width, height, text, callback, font=None, color=(100, 100, 200), hover_color=(150, 150, 250)):
         self.rect = pygame.Rect(x - width // 2, y - height // 2, width, height)
         self.text = text
         self.callback = callback
-        self.font = font or pygame.font.SysFont("arial", 30)
+        self.font = font or FONT_BUTTON
         self.color = color
         self.hover_color = hover_color
-        self.text_surface = self.font.render(text, True, (255, 255, 255))
+        self.text_surface = render_text(self.font, text, WHITE)
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.text_surface = render_text(self.font, text, WHITE)
 
-    
+    def visual_key(self):
+        hovered = self.rect.collidepoint(pygame.mouse.get_pos())
+        return (self.text_surface, self.hover_color if hovered else self.color, tuple(self.rect))
+
+    def get_bounds(self):
+        return self.rect
 
     def draw(self, surface):
         current_color = self.hover_color if self.rect.collidepoint(pygame.mouse.get_pos()) else self.color
@@ -25,6 +51,78 @@ class Button:
                 if self.callback:
                     self.callback()
 
+class LevelButton(Button):
+    def __init__(self, x, y, width, height, text, callback, stars=0, **kwargs):
+        super().__init__(x, y, width, height, text, callback, **kwargs)
+        self.stars = stars
+
+    def visual_key(self):
+        return super().visual_key() + (self.stars,)
+
+    def get_bounds(self):
+        return self.rect.union(pygame.Rect(self.rect.left + 35, self.rect.bottom + 5, 85, 25))
+
+    def draw(self, surface):
+        super().draw(surface)
+        for i in range(3):
+            star_img = settings.UI_IMAGES.get("star" if i < self.stars else "star_empty", pygame.Surface((25, 25), pygame.SRCALPHA))
+            surface.blit(star_img, (self.rect.left + i * 30 + 35, self.rect.bottom + 5))
+
+class Label:
+    def __init__(self, text, font, color, pos, anchor="center"):
+        self.text = text
+        self.font = font
+        self.color = color
+        self.pos = pos
+        self.anchor = anchor
+        self.surface = None
+        self.rect = pygame.Rect(pos, (0, 0))
+
+    def visual_key(self):
+        return (self.text, self.color, self.pos)
+
+    def get_bounds(self):
+        if self.surface is None:
+            self.surface = render_text(self.font, self.text, self.color)
+            self.rect = self.surface.get_rect(**{self.anchor: self.pos})
+        return self.rect
+
+    def draw(self, surface):
+        surface.blit(self.surface, self.get_bounds())
+
+class WidgetLayer:
+    def __init__(self, widgets=()):
+        self.widgets = list(widgets)
+        self.keys = {}
+
+    def set_widgets(self, widgets):
+        self.widgets = list(widgets)
+        self.keys = {}
+
+    def invalidate(self):
+        self.keys = {}
+
+    def draw(self, surface, background=None, damaged=()):
+        # Перерисовываются только виджеты, чей вид изменился или которые задел чужой dirty-rect
+        changed = set()
+        for widget in self.widgets:
+            key = widget.visual_key()
+            if self.keys.get(widget) != key or widget.get_bounds().collidelist(damaged) >= 0:
+                self.keys[widget] = key
+                changed.add(widget)
+        if not changed:
+            return []
+        rects = [widget.get_bounds() for widget in changed]
+        # Соседи, задетые восстановлением фона, рисуются заново
+        redraw = [widget for widget in self.widgets if widget in changed or widget.get_bounds().collidelist(rects) >= 0]
+        rects = [widget.get_bounds() for widget in redraw]
+        if background is not None:
+            for rect in rects:
+                surface.blit(background, rect, rect)
+        for widget in redraw:
+            widget.draw(surface)
+        return rects
+
 class Slider:
     def __init__(self, x, y, width, height, min_val, max_val, initial_val):
         self.rect = pygame.Rect(x, y, width, height)
@@ -45,6 +143,13 @@ class Slider:
             new_val = self.min_val + (mouse_x - self.rect.left) / self.rect.width * (self.max_val - self.min_val)
             self.val = max(self.min_val, min(new_val, self.max_val))
 
+    def visual_key(self):
+        return (self.val, tuple(self.rect))
+
+    def get_bounds(self):
+        radius = self.handle_radius // 2 + 1
+        return pygame.Rect(self.rect.left - radius, self.rect.centery - radius, self.rect.width + radius * 2, radius * 2).union(self.rect)
+
     def get_handle_rect(self):
         handle_x = self.rect.left + (self.val - self.min_val) / (self.max_val - self.min_val) * self.rect.width - self.handle_radius // 2
         return pygame.Rect(handle_x, self.rect.centery - self.handle_radius // 2, self.handle_radius, self.handle_radius)
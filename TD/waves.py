@@ -0,0 +1,55 @@
+import math
+from settings import SIM_TICK_RATE, WAVE_SPAWN_INTERVAL
+
+# Волна в LEVELS_CONFIG - либо {"goblin": 10, "orc": 2} (типы по очереди, раз в WAVE_SPAWN_INTERVAL мс),
+# либо {"groups": [группа, ...]}, где группа:
+#   "enemies": {"goblin": 20, "rogue": 10}
+#   "pattern": "sequential" (по очереди типов) или "interleave" (типы равномерно вперемешку)
+#   "interval": мс между врагами, "delay": мс от начала волны до старта группы
+#   "burst": размер пачки, "burst_pause": мс между пачками
+# Группы могут перекрываться по времени, их спавны сливаются в одну шкалу.
+
+class SpawnTimeline:
+    __slots__ = ("ticks", "types")
+
+    def __init__(self, ticks, types):
+        # ticks[i] - тик от начала волны, не раньше которого появляется types[i]
+        self.ticks = ticks
+        self.types = types
+
+    def __len__(self):
+        return len(self.ticks)
+
+def _order(enemies, pattern):
+    if pattern == "sequential":
+        return [enemy_type for enemy_type, count in enemies.items() for _ in range(count)]
+    if pattern == "interleave":
+        # Каждый тип раскладывается равномерно по длине группы
+        slots = sorted(((index + 0.5) / count, order, enemy_type)
+                       for order, (enemy_type, count) in enumerate(enemies.items()) for index in range(count))
+        return [enemy_type for _, _, enemy_type in slots]
+    raise ValueError(f"Неизвестный порядок спавна: {pattern}")
+
+def compile_group(group):
+    types = _order(group["enemies"], group.get("pattern", "sequential"))
+    interval = group.get("interval", WAVE_SPAWN_INTERVAL)
+    burst = group.get("burst") or 1
+    burst_period = (burst - 1) * interval + group.get("burst_pause", interval)
+    start = group.get("delay", 0) + interval
+    ticks = [math.ceil((start + (index // burst) * burst_period + (index % burst) * interval) * SIM_TICK_RATE / 1000)
+             for index in range(len(types))]
+    return ticks, types
+
+def compile_wave(wave):
+    groups = wave["groups"] if "groups" in wave else [{"enemies": wave}]
+    ticks = []; types = []
+    for group in groups:
+        group_ticks, group_types = compile_group(group)
+        ticks += group_ticks; types += group_types
+    if len(groups) > 1:
+        # Сортировка устойчива: при равном тике раньше идёт более ранняя группа
+        order = sorted(range(len(ticks)), key=ticks.__getitem__)
+        ticks = [ticks[index] for index in order]; types = [types[index] for index in order]
+    return SpawnTimeline(ticks, types)
+
+EMPTY_TIMELINE = SpawnTimeline([], [])